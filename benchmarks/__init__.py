@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmarks
+==========
+
+Reproducible benchmarks of graph construction, dirty propagation, full
+evaluation and incremental reevaluation for every evaluator across
+generated graph shapes and sizes. Results are written as JSON so runs of
+different versions can be compared.
+
+    python -m benchmarks --sizes 10 1000 100000 --output before.json
+    python -m benchmarks --sizes 10 1000 100000 --output after.json
+    python -m benchmarks compare before.json after.json
+'''
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+'''
+Run the benchmarks or compare two result files.
+
+    python -m benchmarks [--shapes ...] [--sizes ...] [--output results.json]
+    python -m benchmarks compare old.json new.json [--threshold 0.1]
+'''
+import argparse
+import json
+import sys
+from .generators import SHAPES
+from .suite import EVALUATORS, run
+
+
+def key(result):
+    return (result['shape'], result['size'], result['evaluator'] or '',
+            result['metric'])
+
+
+def measure(result):
+    return result.get('median', result.get('value'))
+
+
+def describe(result):
+    evaluator = result['evaluator'] or '-'
+    return (f'{result["shape"]:<11} {result["size"]:>8} {evaluator:<9} '
+            f'{result["metric"]:<12}')
+
+
+def log(result):
+    if 'median' in result:
+        print(f'{describe(result)} {result["median"]:12.6f} s '
+              f'(min {result["min"]:.6f})')
+    else:
+        print(f'{describe(result)} {result["value"]:12.1f}')
+
+
+def compare(old_path, new_path, threshold):
+    '''Print the change of every measurement found in both files, returns
+    the number of measurements that regressed by more than threshold.
+    '''
+
+    with open(old_path) as f:
+        old = {key(r): r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = {key(r): r for r in json.load(f)['results']}
+
+    regressions = 0
+    for k in sorted(old.keys() & new.keys()):
+        before, after = measure(old[k]), measure(new[k])
+        ratio = after / before if before else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = ' REGRESSION'
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = ' improved'
+        print(f'{describe(new[k])} {before:12.6g} {after:12.6g} '
+              f'{ratio:6.2f}x{flag}')
+
+    for k in sorted(old.keys() - new.keys()):
+        print(f'{describe(old[k])} missing from {new_path}')
+    print(f'\n{regressions} regressions above {threshold:.0%}')
+    return regressions
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'compare':
+        parser = argparse.ArgumentParser(prog='python -m benchmarks compare')
+        parser.add_argument('old')
+        parser.add_argument('new')
+        parser.add_argument(
+            '--threshold', type=float, default=0.1,
+            help='Relative slowdown reported as a regression',
+        )
+        args = parser.parse_args(argv[1:])
+        return 1 if compare(args.old, args.new, args.threshold) else 0
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('--shapes', nargs='+', choices=list(SHAPES),
+                        default=list(SHAPES))
+    parser.add_argument('--sizes', nargs='+', type=int,
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument('--evaluators', nargs='+', choices=list(EVALUATORS),
+                        default=list(EVALUATORS))
+    parser.add_argument('--func', choices=['add', 'spin', 'nap'],
+                        default='add', help='Registered function of every node')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--io', action='store_true',
+                        help='Also time Graph.save and Graph.open')
+    parser.add_argument('--memory', action='store_true',
+                        help='Also measure bytes per node and edge')
+    parser.add_argument('--output', help='Write results to a JSON file')
+    args = parser.parse_args(argv)
+
+    results = run(
+        args.shapes,
+        args.sizes,
+        args.evaluators,
+        repeat=args.repeat,
+        func=args.func,
+        seed=args.seed,
+        io=args.io,
+        memory=args.memory,
+        log=log,
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
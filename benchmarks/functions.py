@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+'''
+Functions registered for benchmark graphs. Values are kept modulo a prime
+so they stay small on deep graphs while a change to any input still
+changes every downstream result.
+'''
+import time
+import ends
+
+
+PRIME = 1000003
+
+
+@ends.register
+def add(a: int, b: int) -> int:
+    return (a + b) % PRIME
+
+
+@ends.register
+def spin(a: int, b: int) -> int:
+    '''add with about 100us of CPU bound work'''
+
+    value = a + b
+    for i in range(1000):
+        value = (value * 31 + i) % PRIME
+    return (a + b) % PRIME
+
+
+@ends.register
+def nap(a: int, b: int) -> int:
+    '''add that sleeps for 1ms, releasing the GIL like I/O would'''
+
+    time.sleep(0.001)
+    return (a + b) % PRIME
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+'''
+Graph generators. Each takes a number of nodes n, a registered function
+name and a seed and returns a new graph with about n nodes.
+
+Nodes are created and connected in topological order and named explicitly,
+so construction stays linear up to millions of nodes.
+'''
+__all__ = ['SHAPES', 'chain', 'tree', 'fan', 'random_dag', 'lattice']
+
+import math
+import random
+import ends
+
+
+def new(shape, func, n):
+    graph = ends.Graph(f'{shape}_{n}')
+    nodes = [graph.create(func, f'n{i}') for i in range(n)]
+    for node in nodes:
+        node.a.set(1)
+        node.b.set(1)
+    return graph, nodes
+
+
+def chain(n, func='add', seed=0):
+    '''[]-[]-[]-... n nodes long'''
+
+    graph, nodes = new('chain', func, n)
+    for source, dest in zip(nodes, nodes[1:]):
+        graph.connect(source.result, dest.a)
+    return graph
+
+
+def tree(n, func='add', seed=0):
+    '''Binary tree, each node feeding two children'''
+
+    graph, nodes = new('tree', func, n)
+    for i in range(1, n):
+        graph.connect(nodes[(i - 1) // 2].result, nodes[i].a)
+    return graph
+
+
+def fan(n, func='add', seed=0):
+    '''One root fanning out to n / 2 nodes that are reduced pairwise'''
+
+    width = max(1, n // 2)
+    graph, nodes = new('fan', func, 2 * width)
+    root = nodes[0]
+    level = nodes[1:width + 1]
+    for node in level:
+        graph.connect(root.result, node.a)
+    reducers = iter(nodes[width + 1:])
+    while len(level) > 1:
+        next_level = []
+        for a, b in zip(level[::2], level[1::2]):
+            node = next(reducers)
+            graph.connect(a.result, node.a)
+            graph.connect(b.result, node.b)
+            next_level.append(node)
+        level = next_level + level[len(next_level) * 2:]
+    return graph
+
+
+def random_dag(n, func='add', seed=0):
+    '''Each node reads up to two random earlier nodes'''
+
+    rng = random.Random(seed)
+    graph, nodes = new('random_dag', func, n)
+    for i in range(1, n):
+        node = nodes[i]
+        graph.connect(nodes[rng.randrange(i)].result, node.a)
+        if rng.random() < 0.5:
+            graph.connect(nodes[rng.randrange(i)].result, node.b)
+    return graph
+
+
+def lattice(n, func='add', seed=0):
+    '''Square grid of diamonds, each node reads its left and upper node'''
+
+    side = max(1, math.isqrt(n))
+    graph, nodes = new('lattice', func, side * side)
+    for i in range(side):
+        for j in range(side):
+            node = nodes[i * side + j]
+            if i:
+                graph.connect(nodes[(i - 1) * side + j].result, node.a)
+            if j:
+                graph.connect(nodes[i * side + j - 1].result, node.b)
+    return graph
+
+
+SHAPES = {
+    'chain': chain,
+    'tree': tree,
+    'fan': fan,
+    'random_dag': random_dag,
+    'lattice': lattice,
+}
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+'''
+Benchmark cases. Each case builds one generated graph and times
+
+    construct    Creating and connecting every node
+    propagate    Propagating dirty flags from the graph's sources
+    full         Evaluating every node, once per evaluator
+    incremental  Evaluating after changing one parameter mid graph
+
+Timed sections only call into ends, setup and validation of results
+against the SerialEvaluator happen outside of them.
+'''
+__all__ = ['EVALUATORS', 'run', 'run_case', 'benchmark_io', 'benchmark_memory']
+
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import ends
+from ends.__about__ import __version__
+from . import functions  # Registers the benchmark functions
+from .generators import SHAPES
+
+
+EVALUATORS = {
+    'serial': ends.SerialEvaluator,
+    'thread': ends.ThreadPoolEvaluator,
+    'asyncio': ends.AsyncioEvaluator,
+    'hybrid': ends.HybridEvaluator,
+    'parallel': ends.ParallelEvaluator,
+}
+
+
+def timings(times):
+    return {
+        'min': min(times),
+        'median': statistics.median(times),
+        'times': times,
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def values(graph):
+    return {name: node.result.get() for name, node in graph.nodes.items()}
+
+
+def sources(graph):
+    return [node for node in graph.nodes.values()
+            if not graph.dependencies.get(node)]
+
+
+def free_parameter(graph):
+    '''Unconnected parameter of the node closest after the middle of the
+    creation order'''
+
+    nodes = list(graph.nodes.values())
+    middle = len(nodes) // 2
+    for node in nodes[middle:] + nodes[:middle]:
+        for param in node.parameters:
+            if not param.incoming:
+                return param
+
+
+def dirty_all(graph):
+    for node in graph.nodes.values():
+        graph.unclean(node)
+
+
+def run_case(shape, size, evaluators, repeat=3, func='add', seed=0):
+    '''Benchmark one shape and size, returns a list of result dicts'''
+
+    generator = SHAPES[shape]
+    construct = []
+    for i in range(repeat):
+        elapsed, graph = timed(generator, size, func, seed)
+        construct.append(elapsed)
+
+    case = {
+        'shape': shape,
+        'size': size,
+        'nodes': len(graph.nodes),
+        'edges': sum(len(d) for d in graph.dependencies.values()),
+    }
+    results = [dict(case, evaluator=None, metric='construct',
+                    **timings(construct))]
+
+    graph.evaluate()
+    expected = values(graph)
+    roots = sources(graph)
+    propagate = []
+    for i in range(repeat):
+        for node in roots:
+            graph.unclean(node)
+        elapsed, _ = timed(graph.propagate)
+        propagate.append(elapsed)
+        graph.evaluate()
+    results.append(dict(case, evaluator=None, metric='propagate',
+                        **timings(propagate)))
+
+    param = free_parameter(graph)
+    for name in evaluators:
+        graph.set_evaluator(EVALUATORS[name])
+        full = []
+        incremental = []
+        try:
+            for i in range(repeat):
+                dirty_all(graph)
+                elapsed, _ = timed(graph.evaluate)
+                full.append(elapsed)
+                if values(graph) != expected:
+                    raise AssertionError(f'{name} results differ on {shape}')
+
+                param.set(param.get() + 1)
+                elapsed, _ = timed(graph.evaluate)
+                incremental.append(elapsed)
+                param.set(param.get() - 1)
+                graph.evaluate()
+        finally:
+            graph.set_evaluator(ends.SerialEvaluator)
+        results.append(dict(case, evaluator=name, metric='full',
+                            **timings(full)))
+        results.append(dict(case, evaluator=name, metric='incremental',
+                            **timings(incremental)))
+    return results
+
+
+def benchmark_io(size, repeat=3, seed=0):
+    '''Time Graph.save and Graph.open of a random DAG'''
+
+    graph = SHAPES['random_dag'](size, seed=seed)
+    case = {'shape': 'random_dag', 'size': size, 'nodes': len(graph.nodes),
+            'evaluator': None}
+    handle, path = tempfile.mkstemp(suffix='.graph')
+    os.close(handle)
+    save, open_, open_lazy = [], [], []
+    try:
+        for i in range(repeat):
+            save.append(timed(graph.save, path)[0])
+            open_.append(timed(ends.Graph.open, path)[0])
+            open_lazy.append(timed(ends.Graph.open, path, True)[0])
+        opened = ends.Graph.open(path)
+        opened.evaluate()
+        graph.evaluate()
+        if values(opened) != values(graph):
+            raise AssertionError('Opened graph results differ')
+    finally:
+        os.remove(path)
+    return [
+        dict(case, metric='save', **timings(save)),
+        dict(case, metric='open', **timings(open_)),
+        dict(case, metric='open_lazy', **timings(open_lazy)),
+    ]
+
+
+def benchmark_memory(size):
+    '''Bytes allocated per node and per edge of a chain'''
+
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        graph, nodes = ends.Graph(f'memory_{size}'), []
+        for i in range(size):
+            nodes.append(graph.create('add', f'n{i}'))
+        after_nodes = tracemalloc.get_traced_memory()[0]
+        for source, dest in zip(nodes, nodes[1:]):
+            graph.connect(source.result, dest.a)
+        after_edges = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    case = {'shape': 'chain', 'size': size, 'nodes': size, 'evaluator': None}
+    return [
+        dict(case, metric='node_bytes', value=(after_nodes - base) / size),
+        dict(case, metric='edge_bytes',
+             value=(after_edges - after_nodes) / max(1, size - 1)),
+    ]
+
+
+def meta(seed, repeat, func):
+    return {
+        'ends': __version__,
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'seed': seed,
+        'repeat': repeat,
+        'func': func,
+    }
+
+
+def run(shapes, sizes, evaluators, repeat=3, func='add', seed=0,
+        io=False, memory=False, log=None):
+    '''Run every case and return a JSON serializable dict of results.
+    log is called with each result after it was measured.
+    '''
+
+    results = []
+
+    def extend(items):
+        for item in items:
+            results.append(item)
+            if log:
+                log(item)
+
+    for shape in shapes:
+        for size in sizes:
+            extend(run_case(shape, size, evaluators, repeat, func, seed))
+    if io:
+        for size in sizes:
+            extend(benchmark_io(size, repeat, seed))
+    if memory:
+        for size in sizes:
+            extend(benchmark_memory(size))
+    return {'meta': meta(seed, repeat, func), 'results': results}
@@ -1,5 +1,8 @@
 from .api import *
+from .cache import *
 from .func import *
 from .graph import *
 from .evaluators import *
 from .loop import *
+from .profile import *
+from .validate import *
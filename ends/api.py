@@ -17,6 +17,7 @@ __all__ = [
     'disconnect'
 ]
 
+from functools import partial
 from .graph import Graph
 from .func import FuncType
 
@@ -25,14 +26,29 @@ NODE_TYPES = {}
 GRAPHS = {}
 
 
-def register(func):
-    '''Register function'''
+def register(func=None, **options):
+    '''Register function, plain functions and coroutine functions are both
+    supported. Options are passed on to FuncType, to use them register may
+    be called with options only and used as a decorator.
+
+    Examples:
+        >>> @register
+        ... def add(a: float, b: float) -> float:
+        ...     return a + b
+        >>> @register(offload=True)
+        ... def render(scene: str) -> bytes:
+        ...     ...
+    '''
+
+    if func is None:
+        return partial(register, **options)
 
     if func.__name__ in NODE_TYPES:
         raise NameError(f'Function already registered: {func.__name__}')
-    NODE_TYPES[func.__name__] = FuncType(func)
+    NODE_TYPES[func.__name__] = FuncType(func, **options)
     # TODO: Python 2 does not set __annotations__
     #       Set it here or use custom utf-8 encoding to do so
+    return func
 
 
 def unregister(func):
@@ -52,7 +68,9 @@ def get_func_type(name):
 def set_graph(graph):
     '''Set the active graph'''
 
-    Graph.active = graph
+    previous, Graph.active = Graph.active, graph
+    if previous is not None:
+        previous.modified.set()  # Wakes loop.run waiting on it
 
 
 def get_graph(name=None):
@@ -64,7 +82,7 @@ def get_graph(name=None):
 def new_graph(name):
     '''Create new graph and make it the active graph'''
 
-    Graph.active = Graph(name)
+    set_graph(Graph(name))
     return Graph.active
 
 
@@ -74,10 +92,10 @@ def save_graph(path):
     Graph.active.save(path)
 
 
-def open_graph(path):
+def open_graph(path, lazy=False):
     '''Open a graph and make it the active graph'''
 
-    Graph.active = Graph.open(path)
+    set_graph(Graph.open(path, lazy))
     return Graph.active
 
 
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+'''
+Batch Edits
+===========
+
+Journal of the changes made to a graph inside Graph.batch. Each entry
+records enough to undo one change, commit validates every change at once
+and rollback undoes them in reverse.
+
+    create    Func created by Graph.create or Graph.create_many
+    delete    Func removed by Graph.delete, with its place in the graph
+    link      Edge added from a Result to a Parameter
+    unlink    Edge removed from a Result to a Parameter
+    set       Parameter set, with its previous value
+    reorder   Topological order replaced by Graph.reorder
+    index     Positions in the topological order moved by detect_cycle
+    expose    Attribute exposed on the graph
+    unexpose  Attribute no longer exposed on the graph
+'''
+__all__ = ['Journal']
+
+
+class Journal:
+    '''Records changes made to graph until they are committed or rolled
+    back.
+    '''
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.entries = []
+        self.linked = {}  # Result and Parameter pairs, ordered
+        self.values = {}  # Parameters set, ordered
+        self.changed = set()  # Nodes to mark dirty
+
+    def record(self, action, *args):
+        self.entries.append((action, *args))
+        if action == 'link':
+            source, dest = args
+            self.linked[source, dest] = None
+            self.changed.add(dest.parent)
+        elif action == 'unlink':
+            self.changed.add(args[1].parent)
+        elif action == 'set':
+            self.values[args[0]] = None
+            self.changed.add(args[0].parent)
+
+    def commit(self):
+        '''Check types and cycles, then mark changed nodes dirty. Raises
+        like Graph.connect and Parameter.set would have.
+        '''
+
+        from .graph import compatible
+
+        graph = self.graph
+        nodes = graph.nodes
+        checked = set()
+        for source, dest in self.linked:
+            if dest.incoming is not source:
+                continue  # Disconnected later in the batch
+            types = type(source.parent), type(dest.parent), dest.name
+            if types not in checked:
+                assert compatible(source, dest), (
+                    f'Incompatible types: {source} {dest}'
+                )
+                checked.add(types)
+        for param in self.values:
+            if not param.incoming and nodes.get(param.parent.name) is (
+                param.parent
+            ):
+                param.check(param._value)
+        graph.order_edges(
+            (source.parent, dest.parent) for source, dest in self.linked
+            if dest.incoming is source
+        )
+
+        changed = [
+            node for node in self.changed
+            if nodes.get(node.name) is node
+        ]
+        graph.stale.update(changed)
+        graph.dirty.update(changed)
+        if graph.lazy:
+            graph.propagate()
+        if changed:
+            graph.modified.set()
+
+    def rollback(self):
+        '''Undo every recorded change, newest first'''
+
+        graph = self.graph
+        for action, *args in reversed(self.entries):
+            if action == 'create':
+                node, = args
+                graph.nodes.pop(node.name, None)
+                graph._index.pop(node, None)
+                graph.dependencies.pop(node, None)
+                graph.dependents.pop(node, None)
+                graph.dirty.discard(node)
+                graph.stale.discard(node)
+            elif action == 'delete':
+                node, index, dirty, stale = args
+                graph.nodes[node.name] = node
+                graph._index[node] = index
+                if dirty:
+                    graph.dirty.add(node)
+                if stale:
+                    graph.stale.add(node)
+            elif action == 'link':
+                graph.unlink(*args)
+            elif action == 'unlink':
+                graph.link(*args)
+            elif action == 'reorder':
+                graph._index, graph._next_index = args
+            elif action == 'index':
+                graph._index.update(args[0])
+            elif action == 'set':
+                param, value = args
+                param._value = value
+            elif action == 'expose':
+                attrs, name, attr = args
+                attrs.pop(name, None)
+            elif action == 'unexpose':
+                attrs, name, attr = args
+                attrs[name] = attr
+        self.entries = []
+        graph.changed()
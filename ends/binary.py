@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+'''
+Binary Graph Format
+===================
+
+Compact file format used by Graph.save and Graph.open. All integers are
+little endian.
+
+    magic        b'ENDSGRPH'
+    version      uint32
+    header size  uint32
+    header       utf-8 JSON: graph name, func types with their parameter
+                 counts, node names, section sizes and exposed attributes
+    node types   uint32 per node, index into the header's func types
+    edges        uint32 triples (source node, dest node, dest parameter)
+    offsets      uint64 per parameter slot + 1, into the values section
+    values       pickled value of each unconnected parameter
+
+Nodes are written in topological order so edges always point from a lower
+to a higher node index. Loading checks that instead of detecting cycles
+per edge, and builds the graph in bulk.
+'''
+__all__ = ['write_graph', 'read_graph', 'StoredValue']
+
+from array import array
+import json
+import mmap
+import pickle
+import struct
+import sys
+from .func import Lazy
+from .graph import no_gc
+
+
+MAGIC = b'ENDSGRPH'
+VERSION = 1
+
+
+class StoredValue(Lazy):
+    '''Parameter value left pickled in a memory-mapped graph file'''
+
+    def __init__(self, buffer, start, end):
+        self.buffer = buffer
+        self.start = start
+        self.end = end
+
+    def raw(self):
+        return self.buffer[self.start:self.end]
+
+    def resolve(self):
+        return pickle.loads(self.raw())
+
+    def __reduce__(self):
+        # The mmap can not be pickled, ship the stored bytes instead and
+        # unpickle them on the receiving end.
+        return pickle.loads, (self.raw(),)
+
+
+def _little(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def write_graph(graph, path):
+    '''Write graph to path'''
+
+    nodes = graph.order()
+    positions = {node: i for i, node in enumerate(nodes)}
+
+    types = {}
+    node_types = array('I')
+    edges = array('I')
+    offsets = array('Q', [0])
+    values = []
+    size = 0
+    for i, node in enumerate(nodes):
+        func_type = type(node)
+        if func_type not in types:
+            types[func_type] = len(types)
+        node_types.append(types[func_type])
+
+        for j, param in enumerate(node.parameters):
+            if param.incoming:
+                edges.extend((positions[param.incoming.parent], i, j))
+                data = b''
+            elif isinstance(param._value, StoredValue):
+                data = param._value.raw()
+            else:
+                data = pickle.dumps(param._value, pickle.HIGHEST_PROTOCOL)
+            values.append(data)
+            size += len(data)
+            offsets.append(size)
+
+    header = {
+        'name': graph.name,
+        'types': [
+            [func_type.__name__, len(func_type.__signature__.parameters)]
+            for func_type in types
+        ],
+        'names': [node.name for node in nodes],
+        'edges': len(edges) // 3,
+        'slots': len(offsets) - 1,
+        'parameters': {
+            name: [positions[param.parent], param.parent.parameters.index(param)]
+            for name, param in graph.parameters.items()
+        },
+        'results': {
+            name: positions[result.parent]
+            for name, result in graph.results.items()
+        },
+    }
+    header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<II', VERSION, len(header)))
+        f.write(header)
+        f.write(_little(node_types).tobytes())
+        f.write(_little(edges).tobytes())
+        f.write(_little(offsets).tobytes())
+        for data in values:
+            f.write(data)
+
+
+def read_graph(cls, path, lazy=False):
+    '''Read a graph of class cls from path'''
+
+    from .api import get_func_type
+
+    with open(path, 'rb') as f:
+        if lazy:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            buffer = f.read()
+
+    view = memoryview(buffer)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f'Not an ends graph: {path}')
+    version, header_size = struct.unpack_from('<II', view, len(MAGIC))
+    if version != VERSION:
+        raise ValueError(f'Unsupported graph version: {version}')
+    offset = len(MAGIC) + 8
+    header = json.loads(bytes(view[offset:offset + header_size]))
+    offset += header_size
+
+    def section(typecode, count):
+        nonlocal offset
+        values = array(typecode)
+        end = offset + count * values.itemsize
+        values.frombytes(view[offset:end])
+        offset = end
+        return _little(values)
+
+    names = header['names']
+    node_types = section('I', len(names))
+    edges = section('I', header['edges'] * 3)
+    offsets = section('Q', header['slots'] + 1)
+    base = offset
+
+    types = []
+    for name, count in header['types']:
+        func_type = get_func_type(name)
+        if len(func_type.__signature__.parameters) != count:
+            raise ValueError(f'Parameters of {name} changed since saving')
+        types.append(func_type)
+
+    graph = cls(header['name'])
+    with no_gc():
+        _build(graph, header, types, node_types, edges, offsets, buffer, base,
+               lazy, path)
+    return graph
+
+
+def _build(graph, header, types, node_types, edges, offsets, buffer, base,
+           lazy, path):
+    view = memoryview(buffer)
+    names = header['names']
+    nodes = [types[t](name, graph) for name, t in zip(names, node_types)]
+    graph.nodes = {node.name: node for node in nodes}
+    graph._index = {node: i for i, node in enumerate(nodes)}
+    graph._next_index = len(nodes)
+
+    dependencies = graph.dependencies
+    dependents = graph.dependents
+    for i in range(0, len(edges), 3):
+        s, d, j = edges[i], edges[i + 1], edges[i + 2]
+        if s >= d:
+            raise ValueError(f'Edges out of order in {path}')
+        source = nodes[s]
+        dest = nodes[d]
+        dest.parameters[j].incoming = source.result
+        dependencies[dest].add(source)
+        dependents[source].add(dest)
+
+    slot = 0
+    for node in nodes:
+        for param in node.parameters:
+            start = base + offsets[slot]
+            end = base + offsets[slot + 1]
+            if end > start:
+                if lazy:
+                    param._value = StoredValue(buffer, start, end)
+                else:
+                    param._value = pickle.loads(view[start:end])
+            slot += 1
+
+    for name, (i, j) in header['parameters'].items():
+        graph.parameters[name] = nodes[i].parameters[j]
+    for name, i in header['results'].items():
+        graph.results[name] = nodes[i].result
+
+    graph.dirty.update(nodes)
+    graph.stale.update(nodes)
+    graph.changed()
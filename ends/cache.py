@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+'''
+Result Caches
+=============
+
+Memoize node results by FuncType and a hash of the arguments they were
+applied with. Set a cache on a graph to enable it.
+
+    >>> graph.set_cache(ResultCache(maxsize=1024))
+    >>> graph.set_cache(DiskCache('~/.cache/ends', maxbytes=1 << 30))
+
+Keys are stable across processes, they hash the function's registered name,
+version, code, defaults and closure along with the arguments. Functions
+registered with pure=False are never cached.
+'''
+__all__ = ['ResultCache', 'DiskCache', 'cache_key']
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import pickle
+import struct
+import tempfile
+import threading
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+_fingerprints = {}
+
+
+def fingerprint(func_type):
+    '''Hash identifying a FuncType by its registered name and version and
+    its function's code, defaults and closure. None when the defaults or
+    closure can not be pickled.
+    '''
+
+    if func_type not in _fingerprints:
+        func = func_type.__func__
+        key = hashlib.blake2b(digest_size=16)
+        key.update('\0'.join([
+            func_type.__name__,
+            func.__module__,
+            func.__qualname__,
+            repr(func_type.__version__),
+        ]).encode('utf-8'))
+        hash_code(key, func.__code__)
+        try:
+            cells = []
+            for cell in func.__closure__ or ():
+                try:
+                    cells.append(cell.cell_contents)
+                except ValueError:
+                    cells.append(None)  # Empty cell
+            key.update(pickle.dumps(
+                (func.__defaults__, func.__kwdefaults__, cells),
+                protocol=4,
+            ))
+        except Exception:
+            key = None
+        _fingerprints[func_type] = key
+    return _fingerprints[func_type]
+
+
+def hash_code(key, code):
+    '''Update key with a code object and the code objects nested in its
+    constants. Hashing their repr would include their memory address.
+    '''
+
+    key.update(code.co_code)
+    key.update('\0'.join(code.co_names).encode('utf-8'))
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            hash_code(key, const)
+        elif isinstance(const, frozenset):
+            # Set order depends on string hashing, which varies per process
+            key.update(f'\0{sorted(map(repr, const))!r}'.encode('utf-8'))
+        else:
+            key.update(f'\0{const!r}'.encode('utf-8'))
+
+
+def cache_key(node, args, kwargs):
+    '''Key for the result of applying node to args and kwargs. None when the
+    arguments can not be hashed.
+    '''
+
+    try:
+        data = pickle.dumps((args, kwargs), protocol=4)
+    except Exception:
+        return None
+    key = fingerprint(type(node))
+    if key is None:
+        return None
+    key = key.copy()
+    key.update(data)
+    return key.hexdigest()
+
+
+class ResultCache:
+    '''In memory cache of node results with LRU eviction.
+
+    Arguments:
+        maxsize (int): Maximum number of entries, None for no limit
+        maxbytes (int): Maximum total pickled size of the cached values,
+            None for no limit
+    '''
+
+    def __init__(self, maxsize=1024, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key):
+        '''Returns a tuple (hit, value)'''
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value):
+        size = 0
+        if self.maxbytes is not None:
+            try:
+                size = len(pickle.dumps(value, protocol=4))
+            except Exception:
+                return
+            if size > self.maxbytes:
+                return
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old:
+                self.nbytes -= old[1]
+            self.entries[key] = value, size
+            self.nbytes += size
+            self.evict()
+
+    def evict(self):
+        while (
+            (self.maxsize is not None and len(self.entries) > self.maxsize)
+            or (self.maxbytes is not None and self.nbytes > self.maxbytes)
+        ):
+            key, (value, size) = self.entries.popitem(last=False)
+            self.nbytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        '''Dict of hit, miss and eviction counts'''
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.nbytes,
+        }
+
+
+class DiskCache:
+    '''Cache of node results stored in a directory.
+
+    Every entry is a file written atomically, so processes on the same
+    machine can share a directory and reuse each other's results across
+    restarts. bytes, bytearrays and numpy arrays are stored raw and arrays
+    are memory-mapped when read. Other values are pickled. Once the
+    directory grows past maxbytes the least recently used entries are
+    removed.
+
+    Keys only include the code of the registered function itself, not of
+    the helpers or globals it uses. Register the function with a new
+    version, or clear the cache, after changing those.
+
+    Arguments:
+        path (str): Directory to store entries in
+        maxbytes (int): Maximum size of the directory, None for no limit
+    '''
+
+    magic = b'ENDS'
+    align = 64
+
+    def __init__(self, path, maxbytes=None):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        self.nbytes = sum(size for path, mtime, size in self.entries())
+
+    def filename(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    def entries(self):
+        '''Yield (path, mtime, size) of every entry'''
+
+        for folder in os.scandir(self.path):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.startswith('.'):
+                    continue  # Entry still being written
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield entry.path, stat.st_mtime, stat.st_size
+
+    def get(self, key):
+        '''Returns a tuple (hit, value)'''
+
+        filename = self.filename(key)
+        try:
+            value = self.read(filename)
+            os.utime(filename)
+        except Exception:
+            with self.lock:
+                self.misses += 1
+            return False, None
+        with self.lock:
+            self.hits += 1
+        return True, value
+
+    def put(self, key, value):
+        try:
+            header, data = self.dumps(value)
+        except Exception:
+            return
+        if self.maxbytes is not None and len(data) > self.maxbytes:
+            return
+
+        filename = self.filename(key)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename), prefix='.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(data)
+            with self.lock:
+                try:
+                    old = os.stat(filename).st_size  # Replaced below
+                except FileNotFoundError:
+                    old = 0
+                os.replace(tmp, filename)
+                self.nbytes += len(header) + len(data) - old
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        if self.maxbytes is not None and self.nbytes > self.maxbytes:
+            self.evict()
+
+    def dumps(self, value):
+        '''Returns the header and data of an entry'''
+
+        if isinstance(value, (bytes, bytearray)):
+            info = {'kind': type(value).__name__}
+            data = value
+        elif (
+            numpy is not None
+            and isinstance(value, numpy.ndarray)
+            and not value.dtype.hasobject
+        ):
+            info = {
+                'kind': 'ndarray',
+                'dtype': value.dtype.str,
+                'shape': value.shape,
+            }
+            data = numpy.ascontiguousarray(value).data.cast('B')
+        else:
+            info = {'kind': 'pickle'}
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        info = json.dumps(info).encode('utf-8')
+        size = len(self.magic) + 4 + len(info)
+        padding = -size % self.align  # Align data so it can be mapped
+        header = self.magic + struct.pack('<I', len(info)) + info
+        return header + b'\0' * padding, data
+
+    def read(self, filename):
+        with open(filename, 'rb') as f:
+            if f.read(len(self.magic)) != self.magic:
+                raise ValueError(f'Not a cache entry: {filename}')
+            size, = struct.unpack('<I', f.read(4))
+            info = json.loads(f.read(size).decode('utf-8'))
+            offset = len(self.magic) + 4 + size
+            offset += -offset % self.align
+            kind = info['kind']
+
+            if kind == 'ndarray':
+                shape = tuple(info['shape'])
+                if not all(shape):
+                    return numpy.empty(shape, info['dtype'])
+                return numpy.memmap(
+                    filename,
+                    dtype=info['dtype'],
+                    mode='r',
+                    offset=offset,
+                    shape=shape,
+                )
+
+            f.seek(offset)
+            data = f.read()
+            if kind == 'pickle':
+                return pickle.loads(data)
+            if kind == 'bytearray':
+                return bytearray(data)
+            return data
+
+    def evict(self):
+        '''Remove least recently used entries until the directory is back
+        under 90% of maxbytes. Entries written by other processes are
+        included.
+        '''
+
+        with self.lock:
+            entries = sorted(self.entries(), key=lambda entry: entry[1])
+            self.nbytes = sum(size for path, mtime, size in entries)
+            for path, mtime, size in entries:
+                if self.nbytes <= self.maxbytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self.nbytes -= size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            for path, mtime, size in list(self.entries()):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.nbytes = 0
+
+    def stats(self):
+        '''Dict of hit, miss and eviction counts'''
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'bytes': self.nbytes,
+        }
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+'''
+Graph Compiler
+==============
+
+Generates a plain Python function from a graph's exposed parameters and
+results. Nodes upstream of the exposed results are called in topological
+order with their values held in local variables, skipping Parameter and
+Result objects, dirty flags, type checks and the graph's evaluator.
+
+    >>> func = graph.compile()
+    >>> func(a=100.0)
+    100.0
+
+Exposed parameters become keyword only arguments, omitted arguments use the
+parameter's current value. Unconnected parameters that are not exposed are
+read when the function is called, so Parameter.set is still honoured. The
+function returns the same value as calling the graph but leaves the graph
+untouched. Once the structure of the graph or its exposed attributes change
+the function recompiles itself on its next call.
+
+compile_batch generates the function used by Graph.map. It only calls the
+nodes downstream of the parameters being varied, everything else is baked
+into the function as constants so it can be shipped to worker processes.
+'''
+__all__ = ['compile_graph', 'compile_batch']
+
+from keyword import iskeyword
+from .func import run_coroutine
+
+
+_missing = object()
+
+
+def check_names(names):
+    for name in names:
+        if not name.isidentifier() or iskeyword(name) or name[0] == '_':
+            raise ValueError(f'Can not compile exposed name: {name}')
+
+
+def needed(graph):
+    '''Set of nodes the exposed results depend on'''
+
+    nodes = {result.parent for result in graph.results.values()}
+    return nodes | graph.upstream(*nodes)
+
+
+class Builder:
+    '''Collects the source and globals of a generated function'''
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.namespace = {'_missing': _missing, '_run': run_coroutine}
+        self.lines = []
+        self.variables = {}
+
+    def bind(self, prefix, value):
+        '''Add value to the function's globals and return its name'''
+
+        name = f'_{prefix}{len(self.namespace)}'
+        self.namespace[name] = value
+        return name
+
+    def call(self, node, value):
+        '''Add a call to node's function. value returns the expression of a
+        parameter that is not connected to a node called earlier.
+        '''
+
+        func_type = type(node)
+        expressions = []
+        for param in node.parameters:
+            if param.incoming and param.incoming.parent in self.variables:
+                expressions.append(self.variables[param.incoming.parent])
+            else:
+                expressions.append(value(param))
+
+        positional, keywords, var_positional, var_keyword = (
+            func_type.__binding__
+        )
+        args = [expressions[i] for i in positional]
+        if var_positional is not None:
+            args.append(f'*{expressions[var_positional]}')
+        args.extend(f'{name}={expressions[i]}' for name, i in keywords)
+        if var_keyword is not None:
+            args.append(f'**{expressions[var_keyword]}')
+
+        call = self.bind('f', func_type.__func__) + f'({", ".join(args)})'
+        if func_type.__async__:
+            call = f'_run({call})'
+        variable = self.variables[node] = f'_v{len(self.variables)}'
+        self.lines.append(f'    {variable} = {call}')
+
+    def returns(self, results):
+        '''Return the value of a single result or a dict of results'''
+
+        if len(results) == 1:
+            value, = results.values()
+            self.lines.append(f'    return {self.expression(value)}')
+            return
+        items = ', '.join(
+            f'{name!r}: {self.expression(value)}'
+            for name, value in results.items()
+        )
+        self.lines.append(f'    return {{{items}}}')
+
+    def expression(self, result):
+        if result.parent in self.variables:
+            return self.variables[result.parent]
+        return self.bind('c', result.get())
+
+    def build(self, name, arguments):
+        signature = ', '.join(f'{argument}=_missing' for argument in arguments)
+        if signature:
+            signature = '*, ' + signature
+        source = f'def {name}({signature}):\n' + '\n'.join(self.lines) + '\n'
+        code = compile(source, f'<compiled graph {self.graph.name}>', 'exec')
+        exec(code, self.namespace)
+        func = self.namespace[name]
+        func.__source__ = source
+        return func
+
+
+def compile_graph(graph):
+    '''Generate a function evaluating graph's exposed results from its
+    exposed parameters.
+    '''
+
+    check_names(list(graph.parameters) + list(graph.results))
+    builder = Builder(graph)
+    builder.namespace.update(_graph=graph, _version=graph._version)
+
+    arguments = {
+        param: name
+        for name, param in graph.parameters.items()
+        if not param.incoming
+    }
+    builder.lines.append('    if _graph._version != _version:')
+    builder.lines.append(
+        '        return _graph.compile()('
+        + ', '.join(f'{name}={name}' for name in arguments.values())
+        + ')'
+    )
+    for param, name in arguments.items():
+        param = builder.bind('p', param)
+        builder.lines.append(f'    if {name} is _missing:')
+        builder.lines.append(f'        {name} = {param}.get()')
+
+    def value(param):
+        if param in arguments:
+            return arguments[param]
+        param.get()  # Resolve lazy values once
+        return builder.bind('p', param) + '._value'
+
+    nodes = needed(graph)
+    for node in graph.order():
+        if node in nodes:
+            builder.call(node, value)
+    builder.returns(graph.results)
+
+    func = builder.build('compiled', arguments.values())
+    func.__name__ = func.__qualname__ = graph.name
+    return func
+
+
+def compile_batch(graph, names):
+    '''Generate a function evaluating graph's exposed results from the
+    exposed parameters in names. Nodes that do not depend on those
+    parameters are evaluated once now and their results are baked into the
+    function.
+    '''
+
+    check_names(list(names) + list(graph.results))
+    params = {}
+    for name in names:
+        param = graph.parameters[name]
+        if param.incoming:
+            raise AttributeError(f'{param} has an incoming connection')
+        params[param] = name
+
+    varying = {param.parent for param in params}
+    varying |= graph.downstream(*varying)
+    nodes = needed(graph)
+
+    # Evaluated like any other evaluation, under the graph's lock
+    graph.evaluate(targets=[node for node in nodes if node not in varying])
+
+    builder = Builder(graph)
+
+    def value(param):
+        if param.incoming:
+            return builder.bind('c', param.incoming.get())
+        if param in params:
+            return params[param]
+        return builder.bind('c', param.get())
+
+    for param, name in params.items():
+        default = builder.bind('c', param.get())
+        builder.lines.append(f'    if {name} is _missing:')
+        builder.lines.append(f'        {name} = {default}')
+
+    for node in graph.order():
+        if node in nodes and node in varying:
+            builder.call(node, value)
+    builder.returns(graph.results)
+
+    func = builder.build('batch', params.values())
+    func.__name__ = func.__qualname__ = f'{graph.name}_batch'
+    return func
@@ -1,2 +1,5 @@
+from .aio import *
+from .hybrid import *
 from .parallel import *
 from .serial import *
+from .thread import *
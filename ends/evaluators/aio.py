@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+'''
+Asyncio Evaluator
+=================
+
+Evaluates the graph on an asyncio event loop. Every ready node is
+scheduled as a task so coroutine functions registered with ends overlap
+while they await. Plain functions run inline on the loop.
+'''
+__all__ = ['AsyncioEvaluator']
+
+import asyncio
+import time
+from ..func import run_coroutine
+
+
+class AsyncioEvaluator:
+    '''Evaluates dirty nodes as tasks on one event loop.
+
+    Each dirty node counts its dirty dependencies, dependents are scheduled
+    as soon as their count reaches zero. Pass limit to cap the number of
+    nodes running at once.
+    '''
+
+    def __init__(self, graph, limit=None):
+        self.graph = graph
+        self.limit = limit
+
+    def initialize(self):
+        pass
+
+    def uninitialize(self):
+        pass
+
+    def evaluate(self, targets=None):
+        run_coroutine(self.evaluate_async(targets))
+
+    async def evaluate_async(self, targets=None):
+        nodes = self.graph.schedule(targets)
+        if not nodes:
+            return
+
+        dirty = set(nodes)
+        dependencies = self.graph.dependencies
+        waiting = {node: len(dependencies[node] & dirty) for node in nodes}
+        semaphore = asyncio.Semaphore(self.limit) if self.limit else None
+
+        running = {}
+        for node in nodes:
+            if not waiting[node]:
+                running[self.schedule(node, semaphore)] = node
+
+        while running:
+            done, _ = await asyncio.wait(
+                running,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                node = running.pop(task)
+                exc = task.exception()
+                if exc:
+                    for pending in running:
+                        pending.cancel()
+                    await asyncio.gather(*running, return_exceptions=True)
+                    raise exc
+
+                for dependent in self.graph.dependents[node]:
+                    if dependent in waiting:
+                        waiting[dependent] -= 1
+                        if not waiting[dependent]:
+                            running[self.schedule(dependent, semaphore)] = (
+                                dependent
+                            )
+
+    def schedule(self, node, semaphore=None):
+        '''Create a task applying a node whose dependencies are evaluated'''
+
+        if self.graph.profiler is not None:
+            self.graph.profiler.record(node, queued=time.perf_counter())
+        return asyncio.ensure_future(self.apply(node, semaphore))
+
+    async def apply(self, node, semaphore=None):
+        if semaphore:
+            async with semaphore:
+                await node.apply_async()
+        else:
+            await node.apply_async()
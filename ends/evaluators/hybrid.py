@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+'''
+Hybrid Evaluator
+================
+
+Runs cheap nodes inline in the parent process and offloads expensive nodes
+to a process pool. The cost of each FuncType is measured while the graph is
+evaluated and compared against the measured overhead of the pool.
+'''
+__all__ = ['HybridEvaluator']
+
+import time
+import pickle
+from .parallel import ParallelEvaluator
+from .shared import THRESHOLD
+
+
+class HybridEvaluator(ParallelEvaluator):
+    '''Evaluates dirty nodes inline or in a pool of worker processes.
+
+    A node is offloaded when its FuncType's observed runtime is greater than
+    the pool's round trip latency plus the time spent moving its arguments
+    and result, and when other nodes are ready to run alongside it. Nodes
+    of a FuncType that has not been measured yet run inline first. Register
+    a function with offload=True or offload=False to skip the measurement.
+
+    Dirty nodes are walked in topological order like the SerialEvaluator
+    until one of them should be offloaded, only the remaining nodes are
+    scheduled. FuncTypes far faster than the latency are timed once per
+    evaluation. The payload of a FuncType is only measured once its runtime
+    exceeds the pool's latency.
+
+    Arguments:
+        graph (Graph): Graph to evaluate
+        processes (int): Number of worker processes
+        threshold (int): Size in bytes above which results are returned
+            in shared memory, ignored on systems other than POSIX
+        latency (float): Initial estimate of the pool's round trip in seconds
+        byte_cost (float): Seconds spent per byte moved to and from the pool
+        samples (int): Number of runs used to measure the payload of a
+            FuncType
+    '''
+
+    def __init__(
+        self,
+        graph,
+        processes=4,
+        threshold=THRESHOLD,
+        latency=0.001,
+        byte_cost=2e-9,
+        samples=3,
+    ):
+        super().__init__(graph, processes, threshold)
+        self.latency = latency
+        self.byte_cost = byte_cost
+        self.samples = samples
+        self.stats = {}
+        self.ready = []
+        self.offloaded = 0
+        self.submitted = {}
+
+    def evaluate(self, targets=None):
+        nodes = self.graph.schedule(targets)
+        profiler = self.graph.profiler
+        cheap = set()  # FuncTypes far below the latency in this evaluation
+        for i, node in enumerate(nodes):
+            func_type = type(node)
+            if func_type not in cheap and self.offload(node):
+                return self.evaluate_nodes(nodes[i:])
+
+            if profiler is not None:
+                profiler.record(node, queued=time.perf_counter())
+            if func_type in cheap:
+                node.apply()
+            elif not node.unchanged():
+                start = time.perf_counter()
+                node.apply()
+                self.measure(node, time.perf_counter() - start)
+                if self.stats[func_type][0] < self.latency * 0.1:
+                    cheap.add(func_type)
+            if profiler is not None:
+                profiler.record(node, done=time.perf_counter())
+
+    def schedule(self, node):
+        '''Queue a node whose dependencies have all been evaluated'''
+
+        if self.graph.profiler is not None:
+            self.graph.profiler.record(node, queued=time.perf_counter())
+        with self.condition:
+            if self.error:
+                return
+            self.running += 1
+            self.ready.append(node)
+            self.condition.notify()
+
+    def wait(self):
+        '''Offload or run ready nodes until every node has completed'''
+
+        while True:
+            with self.condition:
+                while (
+                    not self.ready
+                    and (self.running if self.error else self.remaining)
+                ):
+                    self.condition.wait()
+                if not self.ready:
+                    return
+                ready, self.ready = self.ready, []
+                if self.error:
+                    self.running -= len(ready)
+                    continue
+                parallel = len(ready) > 1 or self.offloaded > 0
+
+            inline = []
+            for node in ready:
+                if node.unchanged():
+                    super().complete(node)
+                elif self.offload(node, parallel):
+                    self.submit(node)
+                else:
+                    inline.append(node)
+
+            # Earlier inline runs may have measured the FuncType of a node
+            for node in inline:
+                if self.offload(node, parallel):
+                    self.submit(node)
+                else:
+                    self.run(node)
+
+    def offload(self, node, parallel=True):
+        '''Should the node be run in the process pool'''
+
+        func_type = type(node)
+        if func_type.__offload__ is not None:
+            return func_type.__offload__
+        if not parallel or func_type not in self.stats:
+            return False
+        runtime, payload, samples = self.stats[func_type]
+        return runtime > self.latency + payload * self.byte_cost
+
+    def submit(self, node):
+        with self.condition:
+            self.offloaded += 1
+            idle = self.offloaded <= self.processes
+        self.submitted[node] = time.perf_counter(), idle
+        try:
+            self.pool.submit(node, self.complete)
+        except Exception as e:
+            self.complete(node, e)
+
+    def run(self, node):
+        exc = None
+        start = time.perf_counter()
+        try:
+            node.apply()
+        except Exception as e:
+            exc = e
+        elapsed = time.perf_counter() - start
+        if not exc:
+            self.measure(node, elapsed)
+        super().complete(node, exc)
+
+    def complete(self, node, exc=None, elapsed=None):
+        start, idle = self.submitted.pop(node, (None, False))
+        with self.condition:
+            if start is not None:
+                self.offloaded -= 1
+                if elapsed is not None:
+                    # Only trust round trips that did not queue in the pool
+                    if idle:
+                        latency = time.perf_counter() - start - elapsed
+                        self.latency += (latency - self.latency) * 0.3
+                    self.measure(node, elapsed)
+            super().complete(node, exc)
+
+    def measure(self, node, elapsed):
+        '''Record the runtime of a node and sample its payload size.
+        Nodes faster than the pool's latency are never offloaded, their
+        payload is not measured.
+        '''
+
+        func_type = type(node)
+        runtime, payload, samples = self.stats.get(func_type, (None, 0, 0))
+        if runtime is None:
+            runtime = elapsed
+        else:
+            runtime += (elapsed - runtime) * 0.3
+
+        if samples < self.samples and runtime > self.latency:
+            try:
+                size = len(pickle.dumps(node.args_kwargs(resolve=False)))
+                size += len(pickle.dumps(node.result.value(resolve=False)))
+            except Exception:
+                size = float('inf')  # Can not be sent to the pool
+            payload += (size - payload) / (samples + 1)
+            samples += 1
+
+        self.stats[func_type] = runtime, payload, samples
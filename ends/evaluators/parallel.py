@@ -6,96 +6,411 @@ Parallel Evaluator
 Leverages the multiprocessing library to provide parallel evaluation of the
 graph.
 '''
-__all__ = ['FuncTask', 'ProcessPool', 'ParallelEvaluator']
+__all__ = ['FuncTask', 'BatchTask', 'ProcessPool', 'ParallelEvaluator']
 
+import asyncio
 import time
+import threading
 import multiprocessing
+from multiprocessing import resource_tracker
 import cloudpickle
 import pickle
+from .shared import SUPPORTED, THRESHOLD, SharedValue, share, attach, detach
+from ..profile import pickled_size, worker
+
+
+# Functions received by this worker process keyed by FuncType
+_functions = {}
+
+
+def init_worker(functions):
+    '''Pool initializer, loads functions shipped when the pool started'''
+
+    for key, payload in functions.items():
+        _functions[key] = pickle.loads(payload)
 
 
 class FuncTask(object):
+    '''Runs a function from the worker's registry.
+
+    The pickled function is only included when the worker may not have
+    received it yet. A worker that gets a task for an unknown function
+    without a payload flags the task as missing so it can be resubmitted.
+    '''
 
-    def __init__(self, func):
-        self.func = func
+    def __init__(self, key, payload=None, threshold=None):
+        self.key = key
+        self.payload = payload
+        self.threshold = threshold
         self.result = None
         self.exc = None
+        self.missing = False
+        self.elapsed = None
+        self.started = None
+        self.worker = None
 
     def __call__(self, *args, **kwargs):
-        func = pickle.loads(self.func)
+        func = _functions.get(self.key)
+        if func is None:
+            if self.payload is None:
+                self.missing = True
+                return self
+            func = _functions[self.key] = pickle.loads(self.payload)
+        self.payload = None
+        detach()  # Close blocks mapped by previous tasks
+        self.worker = worker()
+        start = self.started = time.perf_counter()
         try:
+            args = tuple(attach(arg) for arg in args)
+            kwargs = {k: attach(v) for k, v in kwargs.items()}
             self.result = func(*args, **kwargs)
+            if asyncio.iscoroutine(self.result):
+                self.result = asyncio.run(self.result)
+            if self.threshold is not None:
+                self.result = share(self.result, self.threshold)
         except Exception as e:
             self.exc = e
+        self.elapsed = time.perf_counter() - start
         return self
 
 
+class BatchTask(object):
+    '''Calls a function generated by Graph.map with each set of keyword
+    arguments in a chunk. The function is unpickled once per worker.
+    '''
+
+    def __init__(self, key, payload):
+        self.key = key
+        self.payload = payload
+
+    def __call__(self, chunk):
+        func = _functions.get(self.key)
+        if func is None:
+            # Only keep the function of the latest batch
+            for key in [k for k in _functions if isinstance(k, tuple)]:
+                del _functions[key]
+            func = _functions[self.key] = pickle.loads(self.payload)
+        return [func(**kwargs) for kwargs in chunk]
+
+
 class ProcessPool:
     '''ProcessPool using stdlib multiprocessing.
 
-    Generic objects supported using cloudpickle.
+    Generic objects supported using cloudpickle. Functions are pickled
+    once per FuncType and shipped to each worker once, either through the
+    pool initializer or along with their first tasks.
+
+    Results of at least threshold bytes are returned in shared memory
+    blocks, see ends.evaluators.shared. Downstream tasks receive a handle
+    to the block and the parent frees it once they have all completed.
+    Pass threshold=None to send every result through the pool's pipes,
+    which is always the case on systems other than POSIX.
     '''
 
-    def __init__(self, processes=None):
+    def __init__(self, processes=None, threshold=THRESHOLD):
         self.processes = processes or multiprocessing.cpu_count()
+        self.threshold = threshold if SUPPORTED else None
         self.pending = {}
         self.pool = None
+        self.payloads = {}
+        self.sent = {}
+        self.shared = {}
+        self.batches = 0
 
-    def start(self):
-        self.pool = multiprocessing.Pool(processes=self.processes)
+    def start(self, func_types=()):
+        functions = {}
+        for func_type in func_types:
+            try:
+                key, payload = self.dump(func_type)
+            except Exception:
+                continue  # Reported when a node of this type is submitted
+            functions[key] = payload
+            self.sent[key] = self.processes
+
+        # Workers must share one tracker with the parent, which unlinks
+        # shared memory blocks the workers created.
+        if self.threshold is not None:
+            resource_tracker.ensure_running()
+        self.pool = multiprocessing.Pool(
+            processes=self.processes,
+            initializer=init_worker,
+            initargs=(functions,),
+        )
 
     def stop(self):
         self.pool.terminate()
         self.pool = None
+        self.sent.clear()
+        self.release()
+
+    def dump(self, func_type):
+        '''Get the key and pickled function for a FuncType'''
+
+        if func_type not in self.payloads:
+            payload = cloudpickle.dumps(func_type.__func__)
+            self.payloads[func_type] = len(self.payloads), payload
+        return self.payloads[func_type]
+
+    def map(self, func, items, chunksize=None):
+        '''Call func with each dict of keyword arguments in items across the
+        pool's workers and return the results in order.
+        '''
+
+        payload = cloudpickle.dumps(func)
+        self.batches += 1
+        key = ('batch', self.batches)
+        if chunksize is None:
+            chunksize = max(1, -(-len(items) // (self.processes * 4)))
+        chunks = [
+            items[i:i + chunksize] for i in range(0, len(items), chunksize)
+        ]
+        results = []
+        for chunk in self.pool.map(BatchTask(key, payload), chunks, 1):
+            results.extend(chunk)
+        return results
+
+    def task(self, node, force=False):
+        '''Create a FuncTask, including the function until every worker is
+        likely to have received it.
+        '''
+
+        key, payload = self.dump(type(node))
+        sent = self.sent.get(key, 0)
+        if force or sent < self.processes:
+            self.sent[key] = sent + 1
+            return FuncTask(key, payload, self.threshold)
+        return FuncTask(key, None, self.threshold)
+
+    def submit(self, node, callback=None, force=False):
+        if node.unchanged():
+            if callback:
+                callback(node, None)
+            return
+
+        args, kwargs = node.args_kwargs(resolve=self.threshold is None)
+        key, hit, value = node.cached(args, kwargs)
+        if hit:
+            node.result.set(value)
+            if callback:
+                callback(node, None)
+            return
+
+        profiler = node.graph.profiler
+        if profiler is not None:
+            start = time.perf_counter()
+            pickled_size((args, kwargs))
+            profiler.record(node, serialize=time.perf_counter() - start)
 
-    def submit(self, node):
-        args, kwargs = node.args_kwargs()
         result = self.pool.apply_async(
-            FuncTask(cloudpickle.dumps(node.__func__)),
+            self.task(node, force),
             args=args,
             kwds=kwargs,
-            callback=self.apply_result(node)
+            callback=self.apply_result(node, callback, key),
+            error_callback=self.apply_error(node, callback),
         )
         self.pending[node] = result
 
-    def apply_result(self, node):
+    def apply_result(self, node, callback=None, key=None):
         def apply_result_to_node(task):
-            if task.exc:
-                raise task.exc
-            self.pending.pop(node)
-            node.result.set(task.result)
+            if task.missing:
+                try:
+                    return self.submit(node, callback, force=True)
+                except Exception as e:
+                    return apply_error_to_node(e)
+            self.pending.pop(node, None)
+            exc = task.exc
+            profiler = node.graph.profiler
+            if profiler is not None and task.started is not None:
+                result = task.result
+                profiler.record(
+                    node,
+                    start=task.started,
+                    end=task.started + task.elapsed,
+                    worker=task.worker,
+                    size=(
+                        result.size if isinstance(result, SharedValue)
+                        else pickled_size(result)
+                    ),
+                )
+            if not exc:
+                try:
+                    node.store(key, task.result)
+                    node.result.set(task.result)
+                except Exception as e:
+                    exc = e
+                self.read(node)
+            if callback:
+                callback(node, exc, task.elapsed)
+            elif exc:
+                raise exc
+        apply_error_to_node = self.apply_error(node, callback)
         return apply_result_to_node
 
+    def read(self, node):
+        '''Track the shared result of node and release the shared results
+        it read once they have no remaining readers.
+        '''
+
+        # Readers are counted per dependent node, a node connected to the
+        # same result through several parameters reads it once.
+        incoming = {param.incoming for param in node.parameters}
+        for result in incoming:
+            record = self.shared.get(result)
+            if record:
+                record[1] -= 1
+                if not record[1]:
+                    self.release(result)
+
+        value = node.result._value
+        if isinstance(value, SharedValue):
+            self.shared[node.result] = [value, self.readers(node)]
+            if not self.shared[node.result][1]:
+                self.release(node.result)
+
+    def readers(self, node):
+        '''Number of dirty dependents that still have to read a result'''
+
+        dependents = node.graph.dependents.get(node, ())
+        return len(node.graph.dirty.intersection(dependents))
+
+    def release(self, result=None):
+        '''Copy shared results into the parent and free their blocks'''
+
+        results = [result] if result else list(self.shared)
+        for result in results:
+            value, readers = self.shared.pop(result)
+            if result._value is value:
+                result._value = value.resolve()
+            value.unlink()
+
+    def apply_error(self, node, callback=None):
+        def apply_error_to_node(exc):
+            self.pending.pop(node, None)
+            if callback:
+                callback(node, exc)
+        return apply_error_to_node
+
 
 class ParallelEvaluator:
+    '''Evaluates dirty nodes in a pool of worker processes.
+
+    Each dirty node counts its dirty dependencies. Completion callbacks
+    from the pool decrement the counts of dependents and submit them as
+    soon as they reach zero, while evaluate blocks on a condition until
+    every node has finished.
+    '''
 
     _pool_ = ProcessPool
 
-    def __init__(self, graph, processes=4):
+    def __init__(self, graph, processes=4, threshold=THRESHOLD):
         self.graph = graph
         self.processes = processes
+        self.threshold = threshold
         self.pool = None
+        self.condition = threading.Condition()
+        self.waiting = {}
+        self.remaining = 0
+        self.running = 0
+        self.error = None
+        self.local = threading.local()
 
     def initialize(self):
-        self.pool = self._pool_(processes=self.processes)
-        self.pool.start()
+        self.pool = self._pool_(
+            processes=self.processes,
+            threshold=self.threshold,
+        )
+        self.pool.start({type(node) for node in self.graph.nodes.values()})
 
     def uninitialize(self):
         self.pool.stop()
 
-    def ready(self):
-        for node in list(self.graph.dirty):
+    def evaluate(self, targets=None):
+        self.evaluate_nodes(self.graph.schedule(targets))
+
+    def evaluate_nodes(self, nodes):
+        '''Evaluate dirty nodes given in topological order'''
+
+        if not nodes:
+            return
 
-            if self.graph.has_dirty_dependent(node):
-                continue
+        dirty = set(nodes)
+        dependencies = self.graph.dependencies
+        with self.condition:
+            self.waiting = {
+                node: len(dependencies[node] & dirty) for node in nodes
+            }
+            self.remaining = len(nodes)
+            self.running = 0
+            self.error = None
+            ready = [node for node in nodes if not self.waiting[node]]
 
-            if node in self.pool.pending:
-                continue
+        for node in ready:
+            self.schedule(node)
+        self.wait()
+        self.pool.release()
 
-            yield node
+        with self.condition:
+            error, self.error = self.error, None
+            self.waiting = {}
 
-    def evaluate(self):
-        while self.graph.dirty:
-            for node in self.ready():
-                self.pool.submit(node)
-            time.sleep(0.001)  # Allow enough time to run async callbacks
+        if error:
+            raise error
+
+    def wait(self):
+        '''Block until every node has completed or, after an error, until
+        every running node has completed.
+        '''
+
+        with self.condition:
+            while self.running if self.error else self.remaining:
+                self.condition.wait()
+
+    def schedule(self, node):
+        '''Submit a node whose dependencies have all been evaluated'''
+
+        with self.condition:
+            if self.error:
+                return
+            self.running += 1
+        if self.graph.profiler is not None:
+            self.graph.profiler.record(node, queued=time.perf_counter())
+        try:
+            self.pool.submit(node, self.complete)
+        except Exception as e:
+            self.complete(node, e)
+
+    def complete(self, node, exc=None, elapsed=None):
+        '''Called when a node finished, schedules dependents that are ready.
+        Pools that time their tasks pass the time spent running the node.
+        '''
+
+        if self.graph.profiler is not None:
+            self.graph.profiler.record(node, done=time.perf_counter())
+
+        ready = []
+        with self.condition:
+            self.running -= 1
+            if exc:
+                self.error = self.error or exc
+            else:
+                self.remaining -= 1
+                for dependent in self.graph.dependents[node]:
+                    if dependent in self.waiting:
+                        self.waiting[dependent] -= 1
+                        if not self.waiting[dependent]:
+                            ready.append(dependent)
+            self.condition.notify()
+
+        # Pools may complete nodes while they are submitted, for example on
+        # a cache hit. Queue their dependents instead of recursing.
+        queue = getattr(self.local, 'queue', None)
+        if queue is not None:
+            queue.extend(ready)
+            return
+
+        self.local.queue = ready
+        try:
+            while ready:
+                self.schedule(ready.pop())
+        finally:
+            self.local.queue = None
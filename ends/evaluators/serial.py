@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 __all__ = ['SerialEvaluator']
 
+import time
+
+
 class SerialEvaluator:
-    '''Provides Serial Evaluation of a Graph.'''
+    '''Provides Serial Evaluation of a Graph.
+
+    Dirty nodes are applied in a single pass using the topological order
+    cached by the graph.
+    '''
 
     def __init__(self, graph):
         self.graph = graph
@@ -13,12 +20,9 @@ class SerialEvaluator:
     def uninitialize(self):
         pass
 
-    def ready(self):
-        for node in list(self.graph.dirty):
-            if not self.graph.has_dirty_dependent(node):
-                yield node
-
-    def evaluate(self):
-        while self.graph.dirty:
-            for node in self.ready():
-                node.apply()
+    def evaluate(self, targets=None):
+        profiler = self.graph.profiler
+        for node in self.graph.schedule(targets):
+            if profiler is not None:
+                profiler.record(node, queued=time.perf_counter())
+            node.apply()
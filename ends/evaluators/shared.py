@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+'''
+Shared Memory Transport
+=======================
+
+Moves large results between processes through multiprocessing.shared_memory
+blocks instead of the pool's pipes. Only a small SharedValue handle is
+pickled, workers map the block to read it. Supports bytes, bytearray and,
+when numpy is installed, numpy arrays. Arrays are mapped without copying.
+
+Only POSIX systems are supported. Workers close the blocks they create and
+leave them to the parent, while on Windows a block is freed as soon as its
+last handle is closed.
+'''
+__all__ = [
+    'SUPPORTED',
+    'THRESHOLD',
+    'SharedValue',
+    'share',
+    'attach',
+    'detach',
+]
+
+import os
+from multiprocessing import shared_memory
+from ..func import Lazy
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Blocks outlive the process that created them
+SUPPORTED = os.name == 'posix'
+
+# Default size in bytes above which results are shared
+THRESHOLD = 1 << 20 if SUPPORTED else None
+
+# Blocks mapped by this process keyed by name
+_attached = {}
+
+
+class SharedValue(Lazy):
+    '''Handle to a value stored in a shared memory block.
+
+    Resolving a SharedValue copies the value into private memory so the
+    block can be freed.
+    '''
+
+    def __init__(self, name, size, type, dtype=None, shape=None):
+        self.name = name
+        self.size = size
+        self.type = type
+        self.dtype = dtype
+        self.shape = shape
+
+    def view(self):
+        '''Map the block and return the value. Arrays share the memory of
+        the block, bytes and bytearrays are copied out of it.
+        '''
+
+        block = _attached.get(self.name)
+        if block is None:
+            block = _attached[self.name] = shared_memory.SharedMemory(
+                self.name
+            )
+        if self.dtype is not None:
+            array = numpy.ndarray(self.shape, self.dtype, buffer=block.buf)
+            array.flags.writeable = False  # Other readers share the block
+            return array
+        return self.type(block.buf[:self.size])
+
+    def resolve(self):
+        value = self.view()
+        if self.dtype is not None:
+            value = value.copy()
+        detach(self.name)
+        return value
+
+    def unlink(self):
+        '''Free the block, views mapped by other processes stay valid'''
+
+        detach(self.name)
+        try:
+            block = shared_memory.SharedMemory(self.name)
+        except FileNotFoundError:
+            return
+        block.close()
+        block.unlink()
+
+
+def share(value, threshold):
+    '''Copy value into a new shared memory block if it is at least threshold
+    bytes and of a supported type, otherwise return value unchanged.
+    '''
+
+    if isinstance(value, (bytes, bytearray)):
+        size = len(value)
+        dtype = shape = None
+    elif numpy is not None and isinstance(value, numpy.ndarray):
+        if value.dtype.hasobject:
+            return value
+        size = value.nbytes
+        dtype, shape = value.dtype, value.shape
+    else:
+        return value
+
+    if size < threshold:
+        return value
+
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        if dtype is not None:
+            numpy.ndarray(shape, dtype, buffer=block.buf)[...] = value
+        else:
+            block.buf[:size] = value
+        return SharedValue(block.name, size, type(value), dtype, shape)
+    finally:
+        block.close()
+
+
+def attach(value):
+    '''Replace a SharedValue with a view of its block'''
+
+    if isinstance(value, SharedValue):
+        return value.view()
+    return value
+
+
+def detach(name=None):
+    '''Close mapped blocks. Blocks still referenced by an array stay mapped
+    until a later call.
+    '''
+
+    names = [name] if name else list(_attached)
+    for name in names:
+        block = _attached.get(name)
+        if block is None:
+            continue
+        try:
+            block.close()
+        except BufferError:
+            continue
+        _attached.pop(name)
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+'''
+Thread Pool Evaluator
+=====================
+
+Evaluates the graph in a pool of threads. Suited to node functions that
+spend their time in I/O or in extensions that release the GIL. Arguments
+and results are passed by reference, nothing is serialized.
+'''
+__all__ = ['ThreadPool', 'ThreadPoolEvaluator']
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+from .parallel import ParallelEvaluator
+from ..profile import pickled_size, worker
+
+
+def timed(profiler, node, func, /, *args, **kwargs):
+    '''Call func and record the run in profiler'''
+
+    start = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        end = time.perf_counter()
+    profiler.record(node, start=start, end=end, worker=worker(),
+                    size=pickled_size(result))
+    return result
+
+
+class ThreadPool:
+    '''ThreadPool using concurrent.futures.ThreadPoolExecutor.
+
+    Provides the same interface as ProcessPool.
+    '''
+
+    def __init__(self, threads=None):
+        self.threads = threads
+        self.pending = {}
+        self.pool = None
+
+    def start(self, func_types=()):
+        self.pool = ThreadPoolExecutor(max_workers=self.threads)
+
+    def stop(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = None
+
+    def release(self):
+        pass  # Results are never copied out of the parent
+
+    def submit(self, node, callback=None):
+        if node.unchanged():
+            if callback:
+                callback(node, None)
+            return
+
+        args, kwargs = node.args_kwargs()
+        key, hit, value = node.cached(args, kwargs)
+        if hit:
+            node.result.set(value)
+            if callback:
+                callback(node, None)
+            return
+
+        if node.__async__:
+            func, args, kwargs = asyncio.run, (node(*args, **kwargs),), {}
+        else:
+            func = node.__func__
+        profiler = node.graph.profiler
+        if profiler is not None:
+            future = self.pool.submit(timed, profiler, node, func, *args,
+                                      **kwargs)
+        else:
+            future = self.pool.submit(func, *args, **kwargs)
+        self.pending[node] = future
+        future.add_done_callback(self.apply_result(node, callback, key))
+
+    def apply_result(self, node, callback=None, key=None):
+        def apply_result_to_node(future):
+            self.pending.pop(node, None)
+            exc = future.exception()
+            if not exc:
+                try:
+                    node.store(key, future.result())
+                    node.result.set(future.result())
+                except Exception as e:
+                    exc = e
+            if callback:
+                callback(node, exc)
+            elif exc:
+                raise exc
+        return apply_result_to_node
+
+
+class ThreadPoolEvaluator(ParallelEvaluator):
+    '''Evaluates dirty nodes in a pool of threads.
+
+    Scheduling is the same as the ParallelEvaluator, only the pool
+    differs.
+    '''
+
+    _pool_ = ThreadPool
+
+    def __init__(self, graph, threads=None):
+        super().__init__(graph)
+        self.threads = threads
+
+    def initialize(self):
+        self.pool = self._pool_(threads=self.threads)
+        self.pool.start()
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+'''
+Events
+======
+
+Signal is a threading.Event that coroutines can wait on as well. Graphs
+set their modified Signal whenever a node is marked dirty, which wakes
+ends.loop.run and ends.loop.serve.
+'''
+__all__ = ['Signal']
+
+import asyncio
+import threading
+
+
+def resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class Signal(threading.Event):
+    '''Event that also wakes coroutines waiting in wait_async'''
+
+    def __init__(self):
+        super().__init__()
+        self.waiters = set()
+
+    def set(self):
+        super().set()
+        for loop, future in list(self.waiters):
+            loop.call_soon_threadsafe(resolve, future)
+
+    async def wait_async(self):
+        '''Coroutine returning once the signal is set'''
+
+        if self.is_set():
+            return True
+        loop = asyncio.get_running_loop()
+        waiter = loop, loop.create_future()
+        self.waiters.add(waiter)
+        try:
+            if not self.is_set():  # Set before the waiter was added
+                await waiter[1]
+        finally:
+            self.waiters.discard(waiter)
+        return True
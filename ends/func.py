@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
-__all__ = ['Parameter', 'Result', 'Func', 'FuncType', 'empty']
+__all__ = ['Parameter', 'Result', 'Func', 'FuncType', 'Lazy', 'empty']
 
+import asyncio
+import threading
+import time
+from inspect import iscoroutinefunction
 try:
     from inspect import signature, Parameter
     empty = Parameter.empty
@@ -9,12 +13,73 @@ except NameError:  # py2 compat
     empty = Parameter.empty
 
 
+class Lazy:
+    '''Base class for values that are resolved the first time they are read.
+
+    Parameters and Results store Lazy values as is and replace them with
+    the resolved value on first get. Set type to the type of the resolved
+    value so it can be checked without resolving it.
+    '''
+
+    type = None
+
+    def resolve(self):
+        raise NotImplementedError
+
+
+def equals(a, b):
+    '''Default equality policy for early cutoff. Values that can not be
+    compared to a single bool, like numpy arrays, never compare equal.
+    '''
+
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    try:
+        return bool(a == b)
+    except Exception:
+        return False
+
+
+def run_coroutine(coroutine):
+    '''Run a coroutine to completion and return its result. asyncio.run
+    can not be called while an event loop runs in this thread, in that case
+    the coroutine runs on a new loop in another thread.
+    '''
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    outcome = []
+
+    def run():
+        try:
+            outcome.append((True, asyncio.run(coroutine)))
+        except BaseException as e:
+            outcome.append((False, e))
+
+    thread = threading.Thread(target=run, name='ends coroutine')
+    thread.start()
+    thread.join()
+    ok, value = outcome[0]
+    if not ok:
+        raise value
+    return value
+
+
 class Parameter:
     '''Descriptor of a Func parameter described by type a annotation'''
 
+    __slots__ = (
+        'name', 'annotation', 'default', 'parent', 'graph', 'incoming',
+        '_value',
+    )
+
     def __init__(self, name, annotation, default, parent, graph=None):
         self.name = name
-        self.path = f'{parent.name}.{name}'
         self.annotation = annotation
         self.default = default
         self.parent = parent
@@ -25,23 +90,44 @@ class Parameter:
     def __str__(self):
         return self.path
 
+    @property
+    def path(self):
+        return f'{self.parent.name}.{self.name}'
+
     def check(self, value):
-        if self.annotation is empty:
+        mode = self.graph.validation
+        if mode == 'off':
             return
-        if not isinstance(value, self.annotation):
+        check = self.parent.__validators__[self.name][mode == 'sample']
+        if check and not check(value):
             raise TypeError(
                 f'Parameter "{self.name}" must be {self.annotation} '
               + f'not {type(value)}'
             )
 
-    def get(self):
+    def get(self, resolve=True):
+        if self.incoming:
+            return self.incoming.get(resolve)
+        return self.value(resolve)
+
+    def value(self, resolve=True):
+        '''Current value as read by evaluators, see Result.value'''
+
         if self.incoming:
-            return self.incoming.get()
-        return self._value
+            return self.incoming.value(resolve)
+        value = self._value
+        if resolve and isinstance(value, Lazy):
+            value = self._value = value.resolve()
+        return value
 
     def set(self, value):
         if self.incoming:
             raise AttributeError(f'{self} has an incoming connection')
+        journal = self.graph.journal
+        if journal is not None:
+            journal.record('set', self, self._value)
+            self._value = value
+            return
         self.check(value)
         self._value = value
         self.graph.unclean(self.parent)
@@ -56,57 +142,113 @@ class Parameter:
 class Result:
     '''Descriptor of a Func return value described by a type annotation'''
 
+    __slots__ = ('name', 'annotation', 'parent', 'graph', '_value')
+
     def __init__(self, name, annotation, parent, graph=None):
         self.name = name
-        self.path = f'{parent.name}.{name}'
         self.annotation = annotation
         self.parent = parent
         self.graph = graph
-        self.outgoing = set()
         self._value = None
 
     def __str__(self):
         return self.path
 
+    @property
+    def path(self):
+        return f'{self.parent.name}.{self.name}'
+
+    @property
+    def outgoing(self):
+        '''Set of Parameters connected to this result'''
+
+        return {
+            param
+            for dependent in self.graph.dependents.get(self.parent, ())
+            for param in dependent.parameters
+            if param.incoming is self
+        }
+
     def check(self, value):
-        if self.annotation is empty:
+        mode = self.graph.validation
+        if mode == 'off':
             return
-        if not isinstance(value, self.annotation):
+        check = self.parent.__validators__['return'][mode == 'sample']
+        if check and not check(value):
             raise TypeError(
                 f'Return value must be {self.annotation}.'
               + f'Got {type(value)}'
             )
 
-    def get(self):
-        return self._value
+    def get(self, resolve=True):
+        '''Value of the last completed evaluation. While the graph
+        evaluates this is the value from before the evaluation started, so
+        reads from other threads see a consistent snapshot. In lazy mode
+        the dirty nodes the result depends on are evaluated first.
+        '''
+
+        graph = self.graph
+        snapshot = graph._snapshot
+        if snapshot is not None:
+            value = self._value  # Read before the snapshot, see set
+            value = snapshot.get(self, value)
+            if resolve and isinstance(value, Lazy):
+                value = value.resolve()
+            return value
+        if graph.lazy and self.parent in graph.dirty:
+            graph.evaluate(targets=[self.parent])
+        return self.value(resolve)
+
+    def value(self, resolve=True):
+        '''Current value, including values set by an evaluation that is
+        still running. Used by evaluators, never evaluates the graph.
+        '''
+
+        value = self._value
+        if resolve and isinstance(value, Lazy):
+            value = self._value = value.resolve()
+        return value
 
     def set(self, value):
         self.check(value)
+        old = self._value
+        changed = not self.parent.equals(old, value)
+        snapshot = self.graph._snapshot
+        if snapshot is not None:
+            snapshot.setdefault(self, old)  # Keep the value readers see
         self._value = value
-        self.graph.clean(self.parent)
+        self.graph.clean(self.parent, changed)
 
     def connect(self, param, force=False):
         self.graph.connect(self, param, force)
 
     def disconnect(self):
-        for param in self.outgoing:
+        for param in list(self.outgoing):
             self.graph.disconnect(self, param)
 
 
 class Func:
     '''Provides a validated interface to a function with type annotations'''
 
+    __slots__ = ('name', 'graph', 'parameters', 'result')
     __func__ = None
     __signature__ = None
+    __binding__ = None
+    __validators__ = None
+    __async__ = False
+    __offload__ = None
+    __pure__ = True
+    __equals__ = staticmethod(equals)
+    __version__ = None
 
     def __init__(self, name, graph=None):
         self.name = name
         self.graph = init_graph(graph)
-        self.parameters = []
         self.__init_params__()
 
     def __init_params__(self):
 
+        parameters = []
         for name, param in self.__signature__.parameters.items():
             p = Parameter(
                 name,
@@ -116,7 +258,8 @@ class Func:
                 self.graph
             )
             setattr(self, name, p)
-            self.parameters.append(p)
+            parameters.append(p)
+        self.parameters = tuple(parameters)
 
         self.result = Result(
             'result',
@@ -142,6 +285,33 @@ class Func:
         else:
             self.graph.clean(self)
 
+    def equals(self, old, new):
+        '''Does a new result equal the old one. Dependents of a node whose
+        result did not change are not reevaluated.
+        '''
+
+        if self.__equals__ is None:
+            return False
+        if isinstance(old, Lazy) or isinstance(new, Lazy):
+            return False
+        try:
+            return self.__equals__(old, new)
+        except Exception:
+            return False
+
+    def unchanged(self):
+        '''Clean the node without applying it when none of its inputs
+        changed. Returns True when the node was cleaned.
+        '''
+
+        graph = self.graph
+        if self in graph.stale:
+            return False
+        graph.clean(self)
+        if graph.profiler is not None:
+            graph.profiler.record(self, skipped=True)
+        return True
+
     def as_string(self):
         args, kwargs = self.args_kwargs()
         params = []
@@ -152,26 +322,88 @@ class Func:
         params = ', '.join(params)
         return f'{self.__func__.__name__}({params})'
 
-    def args_kwargs(self):
-        args = []
-        kwargs = {}
-        for name, param in self.__signature__.parameters.items():
-            value = getattr(self, name).get()
-            if param.kind in (param.KEYWORD_ONLY, param.POSITIONAL_OR_KEYWORD):
-                kwargs[name] = value
-            elif param.kind == param.VAR_KEYWORD:
-                kwargs.update(value)
-            elif param.kind == param.POSITIONAL_ONLY:
-                args.append(value)
-            elif param.kind == param.VAR_POSITIONAL:
-                args.extend(value)
+    def args_kwargs(self, resolve=True):
+        params = self.parameters
+        positional, keywords, var_positional, var_keyword = self.__binding__
+        args = [params[i].value(resolve) for i in positional]
+        if var_positional is not None:
+            args.extend(params[var_positional].value(resolve))
+        kwargs = {name: params[i].value(resolve) for name, i in keywords}
+        if var_keyword is not None:
+            kwargs.update(params[var_keyword].value(resolve))
         return tuple(args), kwargs
 
+    def cached(self, args, kwargs):
+        '''Look up the result of applying args and kwargs in the graph's
+        cache. Returns a tuple (key, hit, value), key is None when the
+        result should not be cached.
+        '''
+
+        cache = self.graph.cache
+        if cache is None or not self.__pure__:
+            return None, False, None
+        key = cache_key(self, args, kwargs)
+        if key is None:
+            return None, False, None
+        hit, value = cache.get(key)
+        return key, hit, value
+
+    def store(self, key, value):
+        '''Store a result in the graph's cache under a key from cached'''
+
+        if key is not None and not isinstance(value, Lazy):
+            self.graph.cache.put(key, value)
+
     def apply(self):
+        if self.unchanged():
+            return
+        profiler = self.graph.profiler
         args, kwargs = self.args_kwargs()
-        result = self.__func__(*args, **kwargs)
+        key, hit, result = self.cached(args, kwargs)
+        if not hit:
+            if profiler is not None:
+                start = time.perf_counter()
+            result = self.__func__(*args, **kwargs)
+            if self.__async__:
+                result = run_coroutine(result)
+            if profiler is not None:
+                self.profiled(start, result)
+            self.store(key, result)
         self.result.set(result)
 
+    async def apply_async(self):
+        if self.unchanged():
+            return
+        profiler = self.graph.profiler
+        args, kwargs = self.args_kwargs()
+        key, hit, result = self.cached(args, kwargs)
+        if not hit:
+            if profiler is not None:
+                start = time.perf_counter()
+            result = self.__func__(*args, **kwargs)
+            if self.__async__:
+                result = await result
+            if profiler is not None:
+                self.profiled(start, result)
+            self.store(key, result)
+        self.result.set(result)
+
+    def profiled(self, start, result):
+        '''Record a run of the node's function in the graph's profiler'''
+
+        self.graph.profiler.record(
+            self,
+            start=start,
+            end=time.perf_counter(),
+            worker=worker(),
+            size=pickled_size(result),
+        )
+
+
+from .cache import cache_key
+from .profile import pickled_size, worker
+from .validate import validators
+
 
 def init_graph(graph=None):
     if graph:
@@ -181,14 +413,69 @@ def init_graph(graph=None):
     return Graph.active
 
 
-def FuncType(func):
-    '''Func factory. Create a new Func type for the given function'''
-
+def binding(sig):
+    '''Plan for binding the values of a signature's parameters to a call.
+
+    Returns a tuple of the indexes of the positional parameters, pairs of
+    name and index of the keyword parameters and the indexes of the var
+    positional and var keyword parameters or None.
+    '''
+
+    positional = []
+    keywords = []
+    var_positional = var_keyword = None
+    params = list(sig.parameters.values())
+    kinds = [param.kind for param in params]
+    for i, param in enumerate(params):
+        if param.kind == param.POSITIONAL_ONLY:
+            positional.append(i)
+        elif param.kind == param.POSITIONAL_OR_KEYWORD:
+            # Values before *args have to be passed by position
+            if param.VAR_POSITIONAL in kinds:
+                positional.append(i)
+            else:
+                keywords.append((param.name, i))
+        elif param.kind == param.VAR_POSITIONAL:
+            var_positional = i
+        elif param.kind == param.KEYWORD_ONLY:
+            keywords.append((param.name, i))
+        elif param.kind == param.VAR_KEYWORD:
+            var_keyword = i
+    return tuple(positional), tuple(keywords), var_positional, var_keyword
+
+
+def FuncType(func, offload=None, pure=True, equals=equals, version=None):
+    '''Func factory. Create a new Func type for the given function
+
+    Arguments:
+        func (callable): Function or coroutine function to wrap
+        offload (bool): HybridEvaluator hint. True always runs nodes in the
+            process pool, False always runs them inline. By default the
+            evaluator decides from the measured cost.
+        pure (bool): False when results do not only depend on arguments,
+            results of impure functions are never cached.
+        equals (callable): Compares a new result to the previous one,
+            dependents are only reevaluated when it returns False. None
+            treats every result as changed.
+        version: Part of the keys of cached results. Change it when a
+            helper the function calls changes, cache keys only include the
+            function's own code.
+    '''
+
+    sig = signature(func)
     return type(
         func.__name__,
         (Func,),
         dict(
+            __slots__=tuple(sig.parameters),
             __func__=staticmethod(func),
-            __signature__=signature(func)
+            __signature__=sig,
+            __binding__=binding(sig),
+            __validators__=validators(sig),
+            __async__=iscoroutinefunction(func),
+            __offload__=offload,
+            __pure__=pure,
+            __equals__=staticmethod(equals) if equals else None,
+            __version__=version,
         )
     )
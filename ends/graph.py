@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
-__all__ = ['Graph']
+__all__ = ['Graph', 'Evaluation']
 
 from collections import defaultdict
+from concurrent.futures import Future
+from contextlib import contextmanager
+import asyncio
+import gc
+import threading
+from .events import Signal
 from .func import Func, Result, Parameter, empty
-from .evaluators import SerialEvaluator
+from .evaluators import SerialEvaluator, ProcessPool
+from .validate import MODES
 
 
 class Graph:
@@ -14,20 +21,38 @@ class Graph:
 
     def __init__(self, name):
         self.name = name
-        self.connections = set()
         self.dependencies = defaultdict(set)
         self.dependents = defaultdict(set)
         self.dirty = set()
+        self.stale = set()
         self.nodes = {}
+        self._order = None
+        self._index = {}
+        self._next_index = 0
+        self._counters = {}
+        self._version = 0
+        self._compiled = None
         self._evaluator = None
         self.set_evaluator(self._evaluator_, **self._evaluator_params_)
+        self.cache = None
+        self.lazy = False
+        self.validation = 'strict'
+        self.profiler = None
+        self.journal = None
+        self.modified = Signal()
+        self._evaluating = threading.Lock()
+        self._snapshot = None
+        self._generation = 0
         self.parameters = {}
         self.results = {}
 
     def __call__(self, **kwargs):
         for name, value in kwargs.items():
             self.parameters[name].set(value)
-        self.evaluate()
+        if self.lazy:
+            self.evaluate(targets=self.results.values())
+        else:
+            self.evaluate()
         if len(self.results) == 1:
             return list(self.results.values())[0].get()
         else:
@@ -43,40 +68,52 @@ class Graph:
 
     def expose(self, param_or_result, name=None):
         name = name or param_or_result.name
-        if name in self.parameters.keys() + self.results.keys():
+        if name in self.parameters or name in self.results:
             raise AttributeError(f'Attribute already exists: {name}')
 
         if isinstance(param_or_result, Parameter):
-            self.parameters[name] = param_or_result
+            attrs = self.parameters
         elif isinstance(param_or_result, Result):
-            self.results[name] = param_or_result
+            attrs = self.results
         else:
             raise TypeError('param_or_result must be a Parameter or Result')
+        attrs[name] = param_or_result
+        if self.journal is not None:
+            self.journal.record('expose', attrs, name, param_or_result)
+        self.changed()
 
-    def unexpose(self, param_or_result=None, name=None):
+    def unexpose(self, param_or_result=None, name=None, missing_ok=False):
         assert param_or_result or name, 'Must pass Parameter, Result, or Name'
 
         if name:
-            if self.parameters.pop(name, None):
-                return
-            if self.results.pop(name, None):
-                return
+            for attrs in (self.parameters, self.results):
+                if attrs.get(name):
+                    self.hide(attrs, name)
+                    return
         else:
             if isinstance(param_or_result, Parameter):
-                p = param_or_result
-                for name, param in list(self.parameters.items()):
-                    if p is param:
-                        self.parameters.pop(name)
-                        return
-            if isinstance(param_or_result, Result):
-                r = param_or_result
-                for name, result in list(self.results.items()):
-                    if r is result:
-                        self.results.pop(name)
-                        return
+                attrs = self.parameters
+            elif isinstance(param_or_result, Result):
+                attrs = self.results
+            else:
+                attrs = {}
+            for name, attr in attrs.items():
+                if attr is param_or_result:
+                    self.hide(attrs, name)
+                    return
+            if missing_ok:
+                return
 
             raise ValueError('param_or_result must be a Parameter or Result')
 
+    def hide(self, attrs, name):
+        '''Remove an exposed attribute from attrs, parameters or results'''
+
+        attr = attrs.pop(name)
+        if self.journal is not None:
+            self.journal.record('unexpose', attrs, name, attr)
+        self.changed()
+
     @property
     def evaluator(self):
         return self._evaluator
@@ -88,8 +125,47 @@ class Graph:
         self._evaluator = evaluator(self, *args, **kwargs)
         self._evaluator.initialize()
 
+    def set_cache(self, cache):
+        '''Set a cache of node results like ResultCache, None disables it'''
+
+        self.cache = cache
+
+    def set_lazy(self, lazy=True):
+        '''In lazy mode nodes are only evaluated when a Result reads them.
+        Result.get evaluates the dirty nodes the result depends on and
+        calling the graph only evaluates the exposed results. Dirty flags
+        are propagated as soon as a node is marked dirty.
+        '''
+
+        self.lazy = lazy
+        if lazy:
+            self.propagate()
+
+    def set_validation(self, mode):
+        '''Set how values are validated by Parameter.set and Result.set.
+        One of "strict", "sample" or "off", see ends.validate.
+        '''
+
+        if mode not in MODES:
+            raise ValueError(f'Validation mode must be one of {MODES}')
+        self.validation = mode
+
+    def set_profiler(self, profiler):
+        '''Set a Profiler to record evaluations, None disables profiling'''
+
+        self.profiler = profiler
+
+    def profile(self, top=10):
+        '''Summary of the evaluations recorded by the graph's profiler, see
+        Profiler.summary.
+        '''
+
+        if self.profiler is None:
+            raise RuntimeError('Profiling is disabled, see set_profiler')
+        return self.profiler.summary(self, top)
+
     def get_node(self, name):
-        return Graph.active.nodes[name]
+        return self.nodes[name]
 
     def has_dirty_dependent(self, node):
         for dependency in self.dependencies[node]:
@@ -97,129 +173,666 @@ class Graph:
                 return True
         return False
 
+    def order(self):
+        '''Nodes in topological order'''
+
+        if self._order is None:
+            self._order = sorted(self.nodes.values(), key=self._index.get)
+        return self._order
+
+    def schedule(self, targets=None):
+        '''Dirty nodes in the order they should be evaluated. Pass targets
+        to only include the dirty nodes that targets depend on.
+        '''
+
+        if targets is None:
+            dirty = self.dirty
+        else:
+            nodes = [n for n in self.nodes_of(targets) if n in self.dirty]
+            dirty = self.dirty.intersection(self.upstream(*nodes))
+            dirty.update(nodes)
+        return sorted(dirty, key=self._index.__getitem__)
+
+    def nodes_of(self, targets):
+        '''Nodes of an iterable of Funcs, Results and exposed result names'''
+
+        nodes = []
+        for target in targets:
+            if isinstance(target, str):
+                target = self.results[target]
+            if isinstance(target, Result):
+                target = target.parent
+            assert isinstance(target, Func), f'{target} must be a Func'
+            nodes.append(target)
+        return nodes
+
+    def reorder(self):
+        '''Recompute the topological order of every node from scratch.
+        Raises a RuntimeError when the graph contains a cycle.
+        '''
+
+        dependencies = self.dependencies
+        dependents = self.dependents
+        counts = {node: len(dependencies[node]) for node in self.nodes.values()}
+        queue = [node for node, count in counts.items() if not count]
+        for node in queue:
+            for dependent in dependents[node]:
+                counts[dependent] -= 1
+                if not counts[dependent]:
+                    queue.append(dependent)
+        if len(queue) != len(counts):
+            raise RuntimeError('Cycle detected')
+
+        if self.journal is not None:
+            self.journal.record('reorder', self._index, self._next_index)
+        self._index = {node: i for i, node in enumerate(queue)}
+        self._next_index = len(queue)
+        self.changed()
+
+    def changed(self):
+        '''Invalidate everything derived from the structure of the graph'''
+
+        self._order = None
+        self._version += 1
+        self._compiled = None
+
+    def compile(self):
+        '''Plain function computing the exposed results from the exposed
+        parameters, see ends.compiler. The function is cached until the
+        structure of the graph changes.
+        '''
+
+        if self._compiled is None:
+            from .compiler import compile_graph
+            self._compiled = compile_graph(self)
+        return self._compiled
+
+    def map(self, items, processes=None, chunksize=None):
+        '''Evaluate the exposed results for each dict of exposed parameter
+        values in items. Returns a list with one return value of Graph.__call__
+        per item, the graph's parameters are left untouched.
+
+        Nodes that do not depend on the varied parameters are evaluated once
+        and shared by every item. The rest of the graph is compiled and run
+        in the process pool of the graph's evaluator, or in a new pool with
+        the given number of processes. Pass processes=1 to run in this
+        process.
+        '''
+
+        from .compiler import compile_batch
+
+        items = list(items)
+        names = {}
+        for kwargs in items:
+            for name, value in kwargs.items():
+                if name not in self.parameters:
+                    raise AttributeError(f'Parameter not exposed: {name}')
+                self.parameters[name].check(value)
+                names[name] = None
+
+        func = compile_batch(self, list(names))
+        if processes == 1 or len(items) < 2:
+            return [func(**kwargs) for kwargs in items]
+
+        pool = getattr(self.evaluator, 'pool', None)
+        if processes is None and isinstance(pool, ProcessPool) and pool.pool:
+            return pool.map(func, items, chunksize)
+
+        pool = ProcessPool(processes, threshold=None)
+        pool.start()
+        try:
+            return pool.map(func, items, chunksize)
+        finally:
+            pool.stop()
+
     def create(self, func_name, name=None):
         from .api import get_func_type
 
         func_type = get_func_type(func_name)
         if name and not name in self.nodes:
             new_name = name
-        elif name in self.nodes:
-            new_name = next_name(name)
         else:
-            new_name = next_name(func_name)
+            new_name = self.next_name(name or func_name)
         new_func = func_type(new_name, graph=self)
 
         self.nodes[new_name] = new_func
+        self._index[new_func] = self._next_index
+        self._next_index += 1
+        if self.journal is not None:
+            self.journal.record('create', new_func)
+        self.changed()
         return new_func
 
+    def create_many(self, func_name, count):
+        '''Create count nodes of a registered function at once. Returns a
+        list of the new nodes named like the nodes made by create.
+        '''
+
+        from .api import get_func_type
+
+        func_type = get_func_type(func_name)
+        nodes = self.nodes
+        index = self._index
+        new_funcs = []
+        with no_gc():
+            for i in range(count):
+                new_func = func_type(self.next_name(func_name), graph=self)
+                nodes[new_func.name] = new_func
+                index[new_func] = self._next_index + i
+                new_funcs.append(new_func)
+        if self.journal is not None:
+            for new_func in new_funcs:
+                self.journal.record('create', new_func)
+        self._next_index += count
+        self.changed()
+        return new_funcs
+
+    def next_name(self, prefix):
+        '''Next available name made of prefix and a number. Each prefix
+        keeps a counter so names are found without rescanning.
+        '''
+
+        i = self._counters.get(prefix, 1)
+        name = f'{prefix}{i}'
+        while name in self.nodes:
+            i += 1
+            name = f'{prefix}{i}'
+        self._counters[prefix] = i + 1
+        return name
+
     def delete(self, node):
         assert isinstance(node, Func), f'{node} must be a Func'
 
         node = self.nodes.pop(node.name, None)
         if node:
+            if self.journal is not None:
+                self.journal.record(
+                    'delete', node, self._index.get(node),
+                    node in self.dirty, node in self.stale,
+                )
             for param in node.parameters:
-                self.unexpose(param)
-                param.disconnect()
-            self.unexpose(node.result)
+                self.unexpose(param, missing_ok=True)
+                if param.incoming:
+                    param.disconnect()
+            self.unexpose(node.result, missing_ok=True)
             node.result.disconnect()
+            self.dependencies.pop(node, None)
+            self.dependents.pop(node, None)
+            self.dirty.discard(node)
+            self.stale.discard(node)
+            self._index.pop(node, None)
+            self.changed()
 
     def connect(self, source, dest, force=False):
         assert isinstance(source, Result), f'{source} must be a Result'
         assert isinstance(dest, Parameter), f'{dest} must be a Parameter'
         if not force:
             assert not dest.incoming, f'{dest} has an incoming connection'
-        assert compatible(source, dest), f'Incompatible types: {source} {dest}'
-        self.detect_cycle(dest.parent, source.parent)
-
-        self.connections.add((source, dest))
-        self.dependencies[dest.parent].add(source.parent)
-        self.dependents[source.parent].add(dest.parent)
-
-        source.outgoing.add(dest)
-        dest.incoming = source
+        if self.journal is None:
+            assert compatible(source, dest), (
+                f'Incompatible types: {source} {dest}'
+            )
+            self.detect_cycle(dest.parent, source.parent)
+        if dest.incoming:
+            self.disconnect(dest.incoming, dest)
+
+        self.link(source, dest)
+        self.changed()
+        if self.journal is None:
+            self.unclean(dest.parent)
+
+    def connect_many(self, pairs, force=False):
+        '''Connect each (Result, Parameter) pair in pairs.
+
+        Cheaper than calling connect for each pair when building large
+        graphs. Cycles are detected by recomputing the topological order
+        once all pairs are connected, and dirty flags are set once. When a
+        cycle is found every new connection is removed before the
+        RuntimeError is raised.
+        '''
 
-        self.unclean(dest.parent)
+        connected = []
+        checked = set()  # Compatible FuncTypes and parameter names
+        with no_gc():
+            try:
+                for source, dest in pairs:
+                    assert isinstance(source, Result), (
+                        f'{source} must be a Result'
+                    )
+                    assert isinstance(dest, Parameter), (
+                        f'{dest} must be a Parameter'
+                    )
+                    if not force:
+                        assert not dest.incoming, (
+                            f'{dest} has an incoming connection'
+                        )
+                    types = type(source.parent), type(dest.parent), dest.name
+                    if types not in checked:
+                        assert compatible(source, dest), (
+                            f'Incompatible types: {source} {dest}'
+                        )
+                        checked.add(types)
+                    previous = dest.incoming
+                    if previous:
+                        self.unlink(previous, dest)
+                    self.link(source, dest)
+                    connected.append((source, dest, previous))
+                self.order_edges(
+                    (source.parent, dest.parent)
+                    for source, dest, previous in connected
+                )
+            except Exception:
+                for source, dest, previous in reversed(connected):
+                    self.unlink(source, dest)
+                    if previous:
+                        self.link(previous, dest)
+                self.changed()
+                raise
+
+        nodes = {dest.parent for source, dest, previous in connected}
+        if self.journal is not None:
+            return  # Marked dirty when the batch is committed
+        self.stale.update(nodes)
+        self.dirty.update(nodes)
+        if self.lazy:
+            self.propagate()
+        self.modified.set()
 
     def disconnect(self, source, dest):
         assert isinstance(source, Result), f'{source} must be a Result'
         assert isinstance(dest, Parameter), f'{dest} must be a Parameter'
 
-        self.connections.discard(source, dest)
-        self.dependencies[dest.parent].discard(source.parent)
-        self.dependents[source.parent].discard(dest.parent)
+        self.unlink(source, dest)
+        self.changed()
+        if self.journal is None:
+            self.unclean(dest.parent)
+
+    def link(self, source, dest):
+        '''Add the edge from source to dest without any checks'''
+
+        self.dependencies[dest.parent].add(source.parent)
+        self.dependents[source.parent].add(dest.parent)
+        dest.incoming = source
+        if self.journal is not None:
+            self.journal.record('link', source, dest)
+
+    def unlink(self, source, dest):
+        '''Remove the edge from source to dest without any checks'''
 
-        source.outgoing.discard(dest)
         dest.incoming = None
 
-        self.unclean(dest.parent)
+        # Another parameter may still connect the same pair of nodes
+        if not any(p.incoming and p.incoming.parent is source.parent
+                   for p in dest.parent.parameters):
+            self.dependencies[dest.parent].discard(source.parent)
+            self.dependents[source.parent].discard(dest.parent)
+        if self.journal is not None:
+            self.journal.record('unlink', source, dest)
+
+    @contextmanager
+    def batch(self):
+        '''Make many changes to the graph at once.
+
+        Inside the block connect, disconnect and Parameter.set skip their
+        type and cycle checks and do not mark nodes dirty. Changes are
+        validated together when the block exits, then the changed nodes are
+        marked dirty. When validation fails, or the block raises, every
+        change made inside the block is rolled back and the error is
+        raised. Don't evaluate the graph inside the block.
+
+            >>> with graph.batch():
+            ...     for a, b in pairs:
+            ...         graph.connect(a.result, b.a)
+        '''
+
+        from .batch import Journal
 
-    def clean(self, node):
-        '''Mark the node as clean'''
+        if self.journal is not None:
+            yield  # Part of the outer batch
+            return
+
+        journal = self.journal = Journal(self)
+        try:
+            yield
+            journal.commit()
+        except BaseException:
+            self.journal = None
+            journal.rollback()
+            raise
+        finally:
+            self.journal = None
+
+    def clean(self, node, changed=False):
+        '''Mark the node as clean. Pass changed=True when the node's result
+        changed to mark its dependents as stale.
+        '''
 
         assert isinstance(node, Func), f'{node} must be a Func'
 
         self.dirty.discard(node)
+        self.stale.discard(node)
+        if changed:
+            for dependent in self.dependents[node]:
+                self.unclean(dependent)
 
     def unclean(self, node):
-        '''Mark the node as dirty'''
+        '''Mark the node as dirty and stale.
+
+        Dirty nodes are only maybe dirty, propagate marks every node
+        downstream of a dirty node as dirty. Stale nodes are known to have
+        changed inputs. During evaluation a dirty node that is not stale by
+        the time its dependencies have been evaluated is cleaned without
+        being applied, see Func.unchanged.
+        '''
 
         assert isinstance(node, Func), f'{node} must be a Func'
 
-        self.dirty.add(node)
+        self.stale.add(node)
+        if self.lazy:
+            if node not in self.dirty:
+                self.propagate(node)
+        else:
+            self.dirty.add(node)
+        if not self.modified.is_set():
+            self.modified.set()
+
+    def order_edges(self, edges):
+        '''Update the topological order to include edges, (source, dest)
+        node pairs linked since the order was last valid. Raises a
+        RuntimeError when they create a cycle.
+
+        Each edge is inserted with detect_cycle while the others are
+        ignored. When the edges are many compared to the nodes of the graph
+        it is cheaper to reorder the whole graph.
+        '''
 
-    def detect_cycle(self, dest, source):
-        '''Walk tree from node, if we encounter node again, we found a cycle'''
+        pending = set(edges)
+        if not pending:
+            return
+        if len(pending) * 16 > len(self.nodes):
+            self.reorder()
+            return
+        try:
+            while pending:
+                source, dest = pending.pop()
+                self.detect_cycle(dest, source, pending)
+        finally:
+            self.changed()
+
+    def detect_cycle(self, dest, source, pending=()):
+        '''Raise a RuntimeError if connecting source to dest would create a
+        cycle, otherwise update the topological order to include the edge.
+
+        Uses the dynamic topological sort of Pearce and Kelly. Only nodes
+        ordered between dest and source are visited, when dest is already
+        ordered after source nothing is visited at all. Edges in pending,
+        (source, dest) node pairs that are not ordered yet, are not
+        followed.
+        '''
 
         if dest is source:
-            raise RuntimeError(f'Cycle detected')
+            raise RuntimeError('Cycle detected')
 
-        for dependent in self.dependents[dest]:
-            self.detect_cycle(dependent, source)
+        index = self._index
+        lower = index[dest]
+        upper = index[source]
+        if lower > upper:
+            return
 
-    def propagate(self, node=None, visited=None):
-        '''Propagate dirty flags'''
+        # Nodes reachable from dest that are ordered before source
+        forward = [dest]
+        visited = {dest}
+        for node in forward:
+            for dependent in self.dependents[node]:
+                if pending and (node, dependent) in pending:
+                    continue
+                if dependent is source:
+                    raise RuntimeError('Cycle detected')
+                if dependent not in visited and index[dependent] < upper:
+                    visited.add(dependent)
+                    forward.append(dependent)
+
+        # Nodes reaching source that are ordered after dest
+        backward = [source]
+        visited = {source}
+        for node in backward:
+            for dependency in self.dependencies[node]:
+                if pending and (dependency, node) in pending:
+                    continue
+                if dependency not in visited and index[dependency] > lower:
+                    visited.add(dependency)
+                    backward.append(dependency)
+
+        # Reuse the same indices, placing backward before forward
+        backward.sort(key=index.__getitem__)
+        forward.sort(key=index.__getitem__)
+        nodes = backward + forward
+        indices = sorted(index[node] for node in nodes)
+        if self.journal is not None:
+            self.journal.record('index', {node: index[node] for node in nodes})
+        for node, i in zip(nodes, indices):
+            index[node] = i
+
+    def downstream(self, *nodes):
+        '''Set of all nodes that depend on any of nodes directly or
+        indirectly. Traversed on each call, keeping a cone per node would
+        take memory quadratic in the depth of the graph.
+        '''
 
-        if not node and not visited:
-            visited = []
-            for node in list(self.dirty):
-                self.propagate(node, visited)
-            return
+        return reachable(nodes, self.dependents)
+
+    def upstream(self, *nodes):
+        '''Set of all nodes that any of nodes depend on directly or
+        indirectly.
+        '''
+
+        return reachable(nodes, self.dependencies)
 
-        if node in visited:
+    def propagate(self, node=None):
+        '''Propagate dirty flags'''
+
+        if node:
+            # In lazy mode nodes downstream of dirty nodes are dirty already
+            self.dirty.add(node)
+            self.dirty |= reachable([node], self.dependents, self.dirty)
             return
 
-        visited.append(node)
-        for dependent in self.dependents[node]:
-            self.unclean(dependent)
-            self.propagate(dependent, visited)
+        self.dirty |= reachable(self.dirty, self.dependents)
 
     @classmethod
-    def open(self, path):
-        # TODO: Open graph
-        raise NotImplementedError
+    def open(cls, path, lazy=False):
+        '''Open a graph saved with Graph.save. With lazy=True parameter
+        values are unpickled from a memory-mapped file on first access.
+        '''
+
+        from .binary import read_graph
+        return read_graph(cls, path, lazy)
+
+    def save(self, path):
+        '''Save the graph in the binary format described in ends.binary'''
 
-    def save(self):
-        # TODO: Save graph
-        raise NotImplementedError
+        from .binary import write_graph
+        write_graph(self, path)
 
-    def evaluate(self):
-        '''Propagate dirty flags through the graph, then evaluate all
-        dirty nodes using the graph's Evaluator.
+    def evaluate(self, targets=None):
+        '''Propagate dirty flags through the graph, then evaluate dirty
+        nodes using the graph's Evaluator. Pass an iterable of Funcs,
+        Results or exposed result names as targets to only evaluate the
+        dirty nodes they depend on, other nodes stay dirty.
+
+        Only one evaluation runs at a time. While it runs Result.get returns
+        the values of the last completed evaluation. When it fails the
+        results it set are restored and their nodes stay dirty.
         '''
 
-        self.propagate()
-        self.evaluator.evaluate()
+        with self._evaluating:
+            self.begin()
+            try:
+                if targets is None:
+                    self.evaluator.evaluate()
+                else:
+                    self.evaluator.evaluate(targets)
+            except BaseException:
+                self.end(failed=True)
+                raise
+            self.end()
+
+    def evaluate_async(self, targets=None):
+        '''Evaluate in the background, see evaluate. Returns an Evaluation,
+        a concurrent.futures.Future that can also be awaited.
+
+        Called from a running event loop, evaluators with an evaluate_async
+        coroutine run as a task on that loop. Otherwise the graph is
+        evaluated in a new thread.
+        '''
 
+        future = Evaluation()
+        future.set_running_or_notify_cancel()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop and hasattr(self.evaluator, 'evaluate_async'):
+            future.task = loop.create_task(
+                self.evaluate_coroutine(future, targets)
+            )
+        else:
+            threading.Thread(
+                target=self.evaluate_thread,
+                args=(future, targets),
+                name=f'evaluate {self.name}',
+                daemon=True,
+            ).start()
+        return future
+
+    def evaluate_thread(self, future, targets=None):
+        try:
+            self.evaluate(targets)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+
+    async def evaluate_coroutine(self, future, targets=None):
+        try:
+            await self.acquire_async()
+        except BaseException as e:
+            future.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise  # The task is cancelled too
+            return
+        try:
+            self.begin()
+            try:
+                if targets is None:
+                    await self.evaluator.evaluate_async()
+                else:
+                    await self.evaluator.evaluate_async(targets)
+            except BaseException:
+                self.end(failed=True)
+                raise
+            self.end()
+        except BaseException as e:
+            future.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        else:
+            future.set_result(None)
+        finally:
+            self._evaluating.release()
 
-def next_name(func_name):
-    '''Get next available name for the given func'''
+    async def acquire_async(self):
+        '''Take the evaluation lock without blocking the event loop'''
+
+        if self._evaluating.acquire(blocking=False):
+            return
+        loop = asyncio.get_running_loop()
+        acquire = loop.run_in_executor(None, self._evaluating.acquire)
+        try:
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # The executor thread still takes the lock, give it back
+            acquire.add_done_callback(lambda f: self._evaluating.release())
+            raise
+
+    def begin(self):
+        '''Start an evaluation, called by evaluate'''
+
+        if not self.lazy:
+            self.propagate()  # Lazy graphs propagate in unclean
+        self._snapshot = {}
+        if self.profiler is not None:
+            self.profiler.begin()
+
+    def end(self, failed=False):
+        '''Complete an evaluation, readers see the new results. A failed
+        evaluation restores the results it set and marks their nodes dirty.
+        '''
+
+        if self.profiler is not None:
+            self.profiler.end()
+        if failed:
+            for result, value in self._snapshot.items():
+                result._value = value
+                self.unclean(result.parent)
+        self._generation += 1  # Before readers stop using the snapshot
+        self._snapshot = None
+
+    def read(self, *results):
+        '''Values of several Results or exposed result names, all from the
+        same completed evaluation. Separate calls to Result.get may straddle
+        the end of an evaluation and mix its results with older ones.
+        '''
 
-    i = 1
-    while True:
-        name = f'{func_name}{i}'
-        if name not in Graph.active.nodes:
-            return name
-        i += 1
+        results = [
+            self.results[r] if isinstance(r, str) else r for r in results
+        ]
+        while True:
+            generation = self._generation
+            values = [result.get() for result in results]
+            if generation == self._generation:
+                return values
+
+
+class Evaluation(Future):
+    '''Future of a background evaluation returned by Graph.evaluate_async.
+    Call result to wait for it, or await it from a coroutine.
+    '''
+
+    task = None
+
+    def __await__(self):
+        return asyncio.wrap_future(self).__await__()
+
+
+@contextmanager
+def no_gc():
+    '''Skip collections triggered by allocating many objects at once'''
+
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def reachable(nodes, edges, skip=()):
+    '''Set of nodes reached from nodes by following edges, a mapping of
+    each node to its dependents or dependencies. Nodes in skip are neither
+    included nor followed.
+    '''
+
+    found = set()
+    stack = list(nodes)
+    while stack:
+        for node in edges[stack.pop()]:
+            if node not in found and node not in skip:
+                found.add(node)
+                stack.append(node)
+    return found
 
 
 def tupilize(value):
@@ -1,26 +1,97 @@
 # -*- coding: utf-8 -*-
-__all__ = ['run', 'stop']
-
-from threading import Event, Thread
+'''
+Event Loop
+==========
+
+Keeps the active graph evaluated. run blocks the calling thread and serve is
+a coroutine for programs built on asyncio. Both sleep until the graph is
+marked dirty, then wait debounce seconds so a burst of changes is evaluated
+once.
+
+    >>> thread = threading.Thread(target=ends.run, kwargs={'debounce': 0.01})
+    >>> thread.start()
+    >>> node.a.set(1.0)  # Evaluated about 10ms later
+    >>> ends.stop()
+'''
+__all__ = ['run', 'serve', 'stop']
+
+import asyncio
 import code
-import time
-import logging
-import sys
+from .events import Signal
 from . import api
 
 
-started = Event()
-stopped = Event()
+started = Signal()
+stopped = Signal()
+watching = set()
 
 
 def stop():
-    stopped.set()
-
+    '''Stop run or serve, waking them if they are waiting for changes'''
 
-def run(interactive=False):
+    stopped.set()
+    for graph in list(watching):
+        graph.modified.set()
+
+
+def wait(graph=None, debounce=0.0, failed=False):
+    '''Block until graph, the active graph by default, has dirty nodes or
+    stop is called. Then wait debounce seconds for more changes. Returns
+    False when stopped.
+
+    After an evaluation failed pass failed=True to wait for a new change
+    instead of retrying right away.
+    '''
+
+    while not stopped.is_set():
+        target = graph or api.get_graph()
+        if target.dirty and not failed:
+            break
+        watching.add(target)
+        try:
+            if not stopped.is_set():  # Stopped before target was watched
+                target.modified.wait()
+            target.modified.clear()
+        finally:
+            watching.discard(target)
+        failed = False
+    if debounce:
+        stopped.wait(debounce)
+    return not stopped.is_set()
+
+
+async def wait_async(graph=None, debounce=0.0, failed=False):
+    '''Coroutine version of wait'''
+
+    while not stopped.is_set():
+        target = graph or api.get_graph()
+        if target.dirty and not failed:
+            break
+        watching.add(target)
+        try:
+            if not stopped.is_set():
+                await target.modified.wait_async()
+            target.modified.clear()
+        finally:
+            watching.discard(target)
+        failed = False
+    if debounce:
+        try:
+            await asyncio.wait_for(stopped.wait_async(), debounce)
+        except asyncio.TimeoutError:
+            pass
+    return not stopped.is_set()
+
+
+def run(interactive=False, debounce=0.0):
+    '''Evaluate the active graph whenever it changes until stop is called.
+
+    In interactive mode a console reads python from stdin and the graph is
+    evaluated after each statement.
+    '''
 
     # Make sure the event loop is not already running
-    if started.isSet():
+    if started.is_set():
         raise Exception('Event loop already initialized')
 
     # Create an active graph is there is none
@@ -41,12 +112,13 @@ def run(interactive=False):
     try:
 
         exc = None
+        failed = False
         started.set()
 
         while True:
 
             # Check if we've stopped
-            if stopped.isSet():
+            if stopped.is_set():
                 break
 
             # Get some input from user
@@ -65,9 +137,16 @@ def run(interactive=False):
                     exc = e
                     print(e)
 
+            # Sleep until the active graph changes
+            elif not wait(debounce=debounce, failed=failed):
+                break
+
             # Evaluate the active graph
+            graph = api.get_graph()
+            graph.modified.clear()
             try:
                 api.evaluate()
+                failed = False
             except KeyboardInterrupt as e:
                 exc = e
                 print(e)
@@ -76,8 +155,44 @@ def run(interactive=False):
                 if e != exc:
                     print(e)
                 exc = e
+                # Ignore nodes marked dirty by the failed evaluation
+                graph.modified.clear()
+                failed = True
 
     finally:
 
         started.clear()
         stopped.clear()
+
+
+async def serve(graph=None, debounce=0.0):
+    '''Coroutine evaluating graph, the active graph by default, whenever it
+    changes until stop is called or the task is cancelled. Evaluation uses
+    Graph.evaluate_async so other tasks keep running.
+    '''
+
+    if started.is_set():
+        raise Exception('Event loop already initialized')
+
+    if not (graph or api.get_graph()):
+        api.new_graph('untitled')
+
+    exc = None
+    failed = False
+    started.set()
+    try:
+        while await wait_async(graph, debounce, failed):
+            target = graph or api.get_graph()
+            target.modified.clear()
+            try:
+                await target.evaluate_async()
+                failed = False
+            except Exception as e:
+                if e != exc:
+                    print(e)
+                exc = e
+                target.modified.clear()
+                failed = True
+    finally:
+        started.clear()
+        stopped.clear()
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+'''
+Profiling
+=========
+
+Records what happens to every node during evaluation. Enable it by setting
+a Profiler on a graph, evaluators and Func.apply skip all of the
+bookkeeping while a graph has no profiler.
+
+    >>> graph.set_profiler(ends.Profiler())
+    >>> graph.evaluate()
+    >>> graph.profile()['types'][0]
+    {'type': 'slow_add', 'count': 16, 'total': 1.61, 'mean': 0.1, 'max': 0.1}
+    >>> graph.profiler.export_chrome('trace.json')
+
+Each record holds some of the following fields, depending on where the
+node ran. Times are time.perf_counter values, which share one clock
+across the processes of a machine.
+
+    node       Name of the node
+    type       Name of the node's FuncType
+    queued     When the node became ready to run
+    start      When its function started
+    end        When its function returned
+    done       When the evaluator completed the node
+    worker     (process id, thread id) that ran the function
+    serialize  Seconds spent pickling arguments for a process pool
+    size       Pickled size of the result in bytes
+    skipped    True when the node was cleaned without running
+'''
+__all__ = ['Profiler']
+
+import json
+import os
+import pickle
+import threading
+import time
+
+
+def worker():
+    '''Identity of the current process and thread'''
+
+    return os.getpid(), threading.get_ident()
+
+
+def pickled_size(value):
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return None
+
+
+class Profiler:
+    '''Collects per node records of each evaluation.
+
+    Arguments:
+        keep (int): Number of evaluations to keep records of
+    '''
+
+    def __init__(self, keep=100):
+        self.keep = keep
+        self.evaluations = []
+        self.records = None
+        self.lock = threading.Lock()
+
+    def begin(self):
+        '''Start recording an evaluation'''
+
+        self.records = {}
+        self.evaluations.append((time.perf_counter(), self.records))
+        del self.evaluations[:-self.keep]
+
+    def end(self):
+        self.records = None
+
+    def record(self, node, **fields):
+        '''Add fields to the record of node in the current evaluation'''
+
+        records = self.records
+        if records is None:
+            return  # Applied outside of Graph.evaluate
+        with self.lock:
+            record = records.get(node)
+            if record is None:
+                record = records[node] = {
+                    'node': node.name,
+                    'type': type(node).__name__,
+                }
+            record.update(fields)
+
+    def clear(self):
+        self.evaluations = []
+
+    def summary(self, graph, top=10):
+        '''Summarize the recorded evaluations of graph.
+
+        Returns a dict of the evaluations' wall time, the FuncTypes with the
+        most total run time and the critical path of the last evaluation,
+        the chain of dependent nodes that took the longest to run.
+        '''
+
+        types = {}
+        wall = 0
+        for started, records in self.evaluations:
+            last = started
+            for record in records.values():
+                last = max(last, record.get('done', record.get('end', 0)))
+                if 'start' not in record or 'end' not in record:
+                    continue
+                duration = record['end'] - record['start']
+                stats = types.setdefault(
+                    record['type'],
+                    {'type': record['type'], 'count': 0, 'total': 0,
+                     'max': 0},
+                )
+                stats['count'] += 1
+                stats['total'] += duration
+                stats['max'] = max(stats['max'], duration)
+            wall += last - started
+
+        for stats in types.values():
+            stats['mean'] = stats['total'] / stats['count']
+        types = sorted(types.values(), key=lambda s: s['total'], reverse=True)
+
+        return {
+            'evaluations': len(self.evaluations),
+            'wall': wall,
+            'types': types[:top],
+            'critical_path': self.critical_path(graph),
+        }
+
+    def critical_path(self, graph):
+        '''List of (node name, run time) along the longest chain of
+        dependent nodes run in the last evaluation.
+        '''
+
+        if not self.evaluations:
+            return []
+        started, records = self.evaluations[-1]
+        timed = {
+            node: record['end'] - record['start']
+            for node, record in records.items()
+            if 'start' in record and 'end' in record
+        }
+
+        lengths = {}
+        previous = {}
+        index = graph._index
+        for node in sorted((n for n in timed if n in index), key=index.get):
+            best = None
+            for dependency in graph.dependencies.get(node, ()):
+                if dependency in lengths and (
+                    best is None or lengths[dependency] > lengths[best]
+                ):
+                    best = dependency
+            previous[node] = best
+            lengths[node] = timed[node] + (lengths[best] if best else 0)
+
+        if not lengths:
+            return []
+        node = max(lengths, key=lengths.get)
+        path = []
+        while node is not None:
+            path.append((node.name, timed[node]))
+            node = previous[node]
+        return path[::-1]
+
+    def export_chrome(self, path):
+        '''Write the recorded evaluations as Chrome trace event JSON, open
+        it in chrome://tracing or https://ui.perfetto.dev
+        '''
+
+        events = []
+        origin = self.evaluations[0][0] if self.evaluations else 0
+
+        def us(seconds):
+            return (seconds - origin) * 1e6
+
+        for started, records in self.evaluations:
+            for record in records.values():
+                pid, tid = record.get('worker', (os.getpid(), 0))
+                args = {
+                    key: record[key]
+                    for key in ('serialize', 'size', 'skipped')
+                    if key in record
+                }
+                if 'queued' in record and 'start' in record:
+                    events.append({
+                        'name': f'{record["node"]} queued',
+                        'cat': 'queue',
+                        'ph': 'X',
+                        'ts': us(record['queued']),
+                        'dur': us(record['start']) - us(record['queued']),
+                        'pid': os.getpid(),
+                        'tid': 0,
+                    })
+                if 'start' in record and 'end' in record:
+                    events.append({
+                        'name': record['node'],
+                        'cat': record['type'],
+                        'ph': 'X',
+                        'ts': us(record['start']),
+                        'dur': us(record['end']) - us(record['start']),
+                        'pid': pid,
+                        'tid': tid,
+                        'args': args,
+                    })
+
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events}, f)
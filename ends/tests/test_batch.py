@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import pytest
+import ends
+
+
+def batch_add(a: float, b: float) -> float:
+    return a + b
+
+
+@pytest.fixture
+def graph():
+    ends.register(batch_add)
+    try:
+        graph = ends.Graph('batch')
+        first = graph.create('batch_add', 'first')
+        second = graph.create('batch_add', 'second')
+        first.a.set(1.0)
+        first.b.set(2.0)
+        second.b.set(3.0)
+        graph.connect(first.result, second.a)
+        graph.expose(first.a, 'x')
+        graph.evaluate()
+        yield graph
+    finally:
+        ends.unregister(batch_add)
+
+
+def edges(edges):
+    return {node: set(nodes) for node, nodes in edges.items() if nodes}
+
+
+def state(graph):
+    nodes = graph.nodes.values()
+    return {
+        'nodes': dict(graph.nodes),
+        'dependencies': edges(graph.dependencies),
+        'dependents': edges(graph.dependents),
+        'incoming': {p: p.incoming for n in nodes for p in n.parameters},
+        'values': {p: p._value for n in nodes for p in n.parameters},
+        'parameters': dict(graph.parameters),
+        'results': dict(graph.results),
+        'order': list(graph.order()),
+        'dirty': set(graph.dirty),
+        'stale': set(graph.stale),
+    }
+
+
+def test_rollback_undoes_every_edit(graph):
+    first, second = graph.nodes['first'], graph.nodes['second']
+    before = state(graph)
+    with pytest.raises(ValueError):
+        with graph.batch():
+            third = graph.create('batch_add', 'third')
+            graph.connect(third.result, second.a, force=True)
+            graph.connect(second.result, third.a)
+            second.b.set(10.0)
+            graph.expose(second.result, 'y')
+            graph.unexpose(name='x')
+            graph.delete(first)
+            raise ValueError('Abort')
+    assert state(graph) == before
+    assert graph.journal is None
+
+    graph.evaluate()
+    assert second.result.get() == 6.0
+
+
+def test_failed_commit_rolls_back(graph):
+    first, second = graph.nodes['first'], graph.nodes['second']
+    before = state(graph)
+    with pytest.raises(RuntimeError):
+        with graph.batch():
+            first.b.set(5.0)
+            graph.connect(second.result, first.a)  # Cycle
+    assert state(graph) == before
+    assert first.b.get() == 2.0
+
+
+def test_commit_marks_changed_nodes_dirty(graph):
+    first, second = graph.nodes['first'], graph.nodes['second']
+    with graph.batch():
+        third = graph.create('batch_add', 'third')
+        graph.connect(second.result, third.a)
+        third.b.set(4.0)
+        first.b.set(5.0)
+    assert {first, third} <= graph.stale
+    graph.evaluate()
+    assert third.result.get() == 13.0
+
+
+def test_commit_orders_few_edges_incrementally(graph):
+    first, second = graph.nodes['first'], graph.nodes['second']
+    nodes = graph.create_many('batch_add', 40)
+    graph.reorder = None  # Must not be called for two edges
+    index = dict(graph._index)
+    with pytest.raises(RuntimeError):
+        with graph.batch():
+            graph.connect(nodes[-1].result, first.b)
+            graph.connect(second.result, nodes[-1].a)  # Cycle
+    assert graph._index == index
+
+    with graph.batch():
+        graph.connect(nodes[-1].result, first.b)
+        graph.connect(nodes[-1].result, nodes[0].a)
+    order = graph.order()
+    assert order.index(nodes[-1]) < order.index(first) < order.index(second)
+    assert order.index(nodes[-1]) < order.index(nodes[0])
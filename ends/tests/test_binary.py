@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import pickle
+import ends
+from ends.binary import StoredValue
+
+
+def stored_scale(a: float, b: float) -> float:
+    return a * b
+
+
+def stored_offload(a: float, b: float) -> float:
+    return a + b
+
+
+def build(path):
+    graph = ends.Graph('stored')
+    first = graph.create('stored_scale', 'first')
+    second = graph.create('stored_offload', 'second')
+    first.a.set(2.0)
+    first.b.set(3.0)
+    second.b.set(4.0)
+    graph.connect(first.result, second.a)
+    graph.save(path)
+
+
+def test_stored_values_pickle_their_value(tmp_path):
+    ends.register(stored_scale)
+    ends.register(stored_offload)
+    try:
+        path = str(tmp_path / 'stored.graph')
+        build(path)
+        graph = ends.Graph.open(path, True)
+        value = graph.nodes['first'].a._value
+        assert isinstance(value, StoredValue)
+        assert pickle.loads(pickle.dumps(value)) == 2.0
+    finally:
+        ends.unregister(stored_scale)
+        ends.unregister(stored_offload)
+
+
+def test_lazy_graphs_evaluate_in_worker_processes(tmp_path):
+    ends.register(stored_scale)
+    ends.register(stored_offload, offload=True)
+    try:
+        path = str(tmp_path / 'stored.graph')
+        build(path)
+        for evaluator in (ends.ParallelEvaluator, ends.HybridEvaluator):
+            graph = ends.Graph.open(path, True)
+            graph.set_evaluator(evaluator, processes=1)
+            try:
+                graph.evaluate()
+            finally:
+                graph.set_evaluator(ends.SerialEvaluator)
+            assert graph.nodes['second'].result.get() == 10.0
+    finally:
+        ends.unregister(stored_scale)
+        ends.unregister(stored_offload)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import ends
+from ends.cache import fingerprint
+
+
+def make(factor, name):
+    def scale(a: float) -> float:
+        return a * factor
+    scale.__name__ = name
+    return scale
+
+
+def test_closures_are_cached_separately():
+    double = make(2, 'test_double')
+    triple = make(3, 'test_triple')
+    ends.register(double)
+    ends.register(triple)
+    try:
+        graph = ends.Graph('closures')
+        graph.set_cache(ends.ResultCache())
+        a = graph.create('test_double')
+        b = graph.create('test_triple')
+        a.a.set(5.0)
+        b.a.set(5.0)
+        graph.evaluate()
+        assert a.result.get() == 10.0
+        assert b.result.get() == 15.0
+    finally:
+        ends.unregister(double)
+        ends.unregister(triple)
+
+
+def test_registered_name_is_part_of_the_key():
+    first = make(2, 'test_first')
+    second = make(2, 'test_second')
+    assert (
+        fingerprint(ends.FuncType(first)).digest()
+        != fingerprint(ends.FuncType(second)).digest()
+    )
+
+
+SCRIPT = textwrap.dedent('''
+    import ends
+    from ends.cache import fingerprint
+
+    def nested(a: list) -> list:
+        return sorted(x for x in a if x in {'a', 'b', 'c'})
+
+    print(fingerprint(ends.FuncType(nested)).hexdigest())
+''')
+
+
+def test_fingerprints_are_stable_across_processes():
+    root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    keys = set()
+    for seed in ('1', '2'):
+        env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=root)
+        keys.add(subprocess.check_output(
+            [sys.executable, '-c', SCRIPT], env=env, text=True,
+        ))
+    assert len(keys) == 1
+
+
+def test_version_is_part_of_the_key():
+    func = make(2, 'test_versioned')
+    keys = {
+        fingerprint(ends.FuncType(func, version=version)).digest()
+        for version in (None, 1, 2)
+    }
+    assert len(keys) == 3
+
+
+def test_disk_cache_counts_overwritten_entries_once(tmp_path):
+    cache = ends.DiskCache(str(tmp_path))
+    cache.put('ab' * 16, b'x' * 100)
+    size = cache.nbytes
+    cache.put('ab' * 16, b'x' * 100)
+    assert cache.nbytes == size
+    cache.put('ab' * 16, b'x' * 200)
+    assert cache.nbytes == size + 100
+    assert cache.nbytes == ends.DiskCache(str(tmp_path)).nbytes
+
+
+def test_disk_cache_counts_from_threads(tmp_path):
+    cache = ends.DiskCache(str(tmp_path))
+    keys = [f'{i:032x}' for i in range(8)]
+
+    def work():
+        for key in keys:
+            cache.put(key, b'x' * 10)
+            cache.get(key)
+            cache.get('f' * 32)
+
+    threads = [threading.Thread(target=work) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.hits == 32 and cache.misses == 32
+    assert cache.nbytes == ends.DiskCache(str(tmp_path)).nbytes
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import threading
+import pytest
+import ends
+
+
+def compiled_add(a: float, b: float) -> float:
+    return a + b
+
+
+@pytest.fixture
+def graph():
+    ends.register(compiled_add)
+    try:
+        graph = ends.Graph('compiled')
+        shared = graph.create('compiled_add', 'shared')
+        varied = graph.create('compiled_add', 'varied')
+        shared.a.set(1.0)
+        shared.b.set(2.0)
+        varied.b.set(0.0)
+        graph.connect(shared.result, varied.a)
+        graph.expose(varied.b, 'x')
+        graph.expose(varied.result, 'y')
+        yield graph
+    finally:
+        ends.unregister(compiled_add)
+
+
+def test_map_evaluates_shared_nodes_with_the_graph(graph):
+    shared = graph.nodes['shared']
+    evaluations = []
+    evaluate = graph.evaluate
+
+    def record(targets=None):
+        evaluations.append(list(targets))
+        evaluate(targets)
+
+    graph.evaluate = record
+    assert graph.map([{'x': 1.0}, {'x': 2.0}], processes=1) == [4.0, 5.0]
+    assert evaluations == [[shared]]
+    assert shared not in graph.dirty
+    assert graph.nodes['varied'] in graph.dirty
+
+
+def test_map_waits_for_a_running_evaluation(graph):
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(graph.map([{'x': 1.0}], processes=1))
+    )
+    with graph._evaluating:  # As if evaluate_async was running
+        thread.start()
+        thread.join(0.1)
+        assert thread.is_alive() and graph.nodes['shared'] in graph.dirty
+    thread.join(5)
+    assert results == [[4.0]]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import pytest
+import ends
+
+
+calls = []
+
+
+def cutoff_clamp(a: float) -> float:
+    return min(a, 10.0)
+
+
+def cutoff_count(a: float) -> float:
+    calls.append(a)
+    return a * 2
+
+
+@pytest.fixture
+def graph():
+    ends.register(cutoff_clamp)
+    ends.register(cutoff_count)
+    del calls[:]
+    try:
+        graph = ends.Graph('cutoff')
+        clamp = graph.create('cutoff_clamp', 'clamp')
+        count = graph.create('cutoff_count', 'count')
+        other = graph.create('cutoff_count', 'other')
+        clamp.a.set(20.0)
+        graph.connect(clamp.result, count.a)
+        graph.connect(clamp.result, other.a)
+        graph.evaluate()
+        del calls[:]
+        yield graph
+    finally:
+        ends.unregister(cutoff_clamp)
+        ends.unregister(cutoff_count)
+
+
+def test_unchanged_results_cut_off_targets(graph):
+    clamp, count, other = (graph.nodes[n] for n in ('clamp', 'count', 'other'))
+    clamp.a.set(30.0)
+    graph.evaluate(targets=[count])
+    assert calls == []
+    assert count not in graph.dirty and count not in graph.stale
+    assert other in graph.dirty  # Not a target
+
+    clamp.a.set(5.0)
+    graph.evaluate(targets=[count.result])
+    assert calls == [5.0]
+    assert count.result.get() == 10.0
+    assert other in graph.dirty and other in graph.stale
+
+
+def test_unchanged_results_cut_off_lazy_reads(graph):
+    clamp, count, other = (graph.nodes[n] for n in ('clamp', 'count', 'other'))
+    graph.set_lazy()
+    clamp.a.set(30.0)
+    assert count in graph.dirty
+    assert count.result.get() == 20.0
+    assert calls == []
+
+    clamp.a.set(5.0)
+    assert count.result.get() == 10.0
+    assert other.result.get() == 10.0
+    assert calls == [5.0, 5.0]
+    assert not graph.dirty
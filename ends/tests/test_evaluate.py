@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import pytest
+import ends
+
+
+def checked_add(a: float, b: float) -> float:
+    return a + b
+
+
+def checked_positive(a: float) -> float:
+    if a < 0:
+        raise ValueError('Negative')
+    return a
+
+
+@pytest.fixture
+def graph():
+    ends.register(checked_add)
+    ends.register(checked_positive)
+    try:
+        graph = ends.Graph('evaluate')
+        add = graph.create('checked_add', 'add')
+        positive = graph.create('checked_positive', 'positive')
+        add.a.set(1.0)
+        add.b.set(2.0)
+        graph.connect(add.result, positive.a)
+        graph.evaluate()
+        yield graph
+    finally:
+        ends.unregister(checked_add)
+        ends.unregister(checked_positive)
+
+
+def test_failed_evaluation_keeps_previous_results(graph):
+    add, positive = graph.nodes['add'], graph.nodes['positive']
+    add.a.set(-10.0)
+    with pytest.raises(ValueError):
+        graph.evaluate()
+    assert graph.read(add.result, positive.result) == [3.0, 3.0]
+    assert add in graph.dirty and positive in graph.dirty
+
+    add.a.set(10.0)
+    graph.evaluate()
+    assert graph.read(add.result, positive.result) == [12.0, 12.0]
+
+
+def test_read_returns_results_of_one_evaluation(graph):
+    add, positive = graph.nodes['add'], graph.nodes['positive']
+    graph.expose(positive.result)
+    reads = iter([None, lambda: graph.evaluate()])
+    get = ends.Result.get
+
+    def evaluate_between_reads(self, resolve=True):
+        evaluate = next(reads, None)
+        value = get(self, resolve)
+        if evaluate:
+            evaluate()  # Completes after the first result was read
+        return value
+
+    add.a.set(5.0)
+    ends.Result.get = evaluate_between_reads
+    try:
+        values = graph.read(add.result, 'result')
+    finally:
+        ends.Result.get = get
+    assert values == [7.0, 7.0]
+
+
+def test_cancelled_evaluation_releases_the_lock(graph):
+    graph.set_evaluator(ends.AsyncioEvaluator)
+
+    async def main():
+        graph._evaluating.acquire()
+        evaluation = graph.evaluate_async()
+        await asyncio.sleep(0.05)  # Waiting for the lock in an executor
+        evaluation.task.cancel()
+        await asyncio.sleep(0)
+        graph._evaluating.release()
+        await asyncio.sleep(0.05)
+        assert evaluation.task.cancelled()
+        return evaluation
+
+    evaluation = asyncio.run(main())
+    with pytest.raises(asyncio.CancelledError):
+        evaluation.result(timeout=1)
+    assert graph._evaluating.acquire(timeout=1)
+    graph._evaluating.release()
+
+
+async def checked_fetch(a: float) -> float:
+    await asyncio.sleep(0)
+    return a * 10
+
+
+def test_evaluate_coroutine_nodes_from_a_running_loop(graph):
+    ends.register(checked_fetch)
+    try:
+        fetch = graph.create('checked_fetch')
+        graph.connect(graph.nodes['positive'].result, fetch.a)
+
+        async def main():
+            graph.evaluate()
+            first = fetch.result.get()
+            graph.set_evaluator(ends.AsyncioEvaluator)
+            graph.nodes['add'].a.set(2.0)
+            graph.evaluate()
+            graph.expose(graph.nodes['add'].a, 'x')
+            graph.expose(fetch.result, 'y')
+            return first, fetch.result.get(), graph.compile()(x=3.0)
+
+        assert asyncio.run(main()) == (30.0, 40.0, 50.0)
+    finally:
+        ends.unregister(checked_fetch)
+
+
+async def checked_wait(a: float) -> float:
+    await asyncio.sleep(10)
+    return a
+
+
+def test_cancelling_a_running_evaluation_cancels_its_task(graph):
+    ends.register(checked_wait)
+    try:
+        wait = graph.create('checked_wait')
+        wait.a.set(1.0)
+        graph.set_evaluator(ends.AsyncioEvaluator)
+
+        async def main():
+            evaluation = graph.evaluate_async()
+            await asyncio.sleep(0.05)
+            evaluation.task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await evaluation.task
+            with pytest.raises(asyncio.CancelledError):
+                await evaluation
+
+        asyncio.run(main())
+        assert wait in graph.dirty
+        assert graph._evaluating.acquire(blocking=False)
+        graph._evaluating.release()
+    finally:
+        ends.unregister(checked_wait)
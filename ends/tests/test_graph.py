@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import random
+import pytest
+import ends
+
+
+def ordered_add(a: float, b: float) -> float:
+    return a + b
+
+
+@pytest.fixture
+def graph():
+    ends.register(ordered_add)
+    try:
+        yield ends.Graph('ordered')
+    finally:
+        ends.unregister(ordered_add)
+
+
+def assert_ordered(graph):
+    order = {node: i for i, node in enumerate(graph.order())}
+    for node, dependencies in graph.dependencies.items():
+        for dependency in dependencies:
+            assert order[dependency] < order[node]
+
+
+def test_edges_against_the_order_reorder_nodes(graph):
+    first, second, third = (graph.create('ordered_add') for i in range(3))
+    for node in (first, second, third):
+        node.b.set(1.0)
+    third.a.set(1.0)
+    graph.connect(third.result, second.a)
+    graph.connect(second.result, first.a)
+    assert graph.order() == [third, second, first]
+
+    graph.evaluate()
+    assert first.result.get() == 4.0
+
+
+def test_random_edges_keep_a_topological_order(graph):
+    rng = random.Random(0)
+    nodes = [graph.create('ordered_add') for i in range(30)]
+    rank = list(range(len(nodes)))
+    rng.shuffle(rank)  # Edges follow this order, not the creation order
+    for i in range(60):
+        source, dest = rng.sample(nodes, 2)
+        if rank[nodes.index(source)] > rank[nodes.index(dest)]:
+            source, dest = dest, source
+        param = dest.a if not dest.a.incoming else dest.b
+        if not param.incoming:
+            graph.connect(source.result, param)
+        assert_ordered(graph)
+
+
+def test_cycles_against_the_order_are_rejected(graph):
+    first, second, third = (graph.create('ordered_add') for i in range(3))
+    graph.connect(third.result, second.a)
+    graph.connect(second.result, first.a)
+    order = graph.order()
+
+    with pytest.raises(RuntimeError):
+        graph.connect(first.result, third.a)
+    with pytest.raises(RuntimeError):
+        graph.connect(second.result, second.b)
+    assert third.a.incoming is None and second.b.incoming is None
+    assert not graph.dependencies[third]
+    assert graph.order() == order
+
+
+def test_cones_of_several_nodes(graph):
+    first, second, third, fourth = (
+        graph.create('ordered_add') for i in range(4)
+    )
+    graph.connect(first.result, second.a)
+    graph.connect(second.result, third.a)
+    graph.connect(fourth.result, third.b)
+    assert graph.downstream(first) == {second, third}
+    assert graph.downstream(first, fourth) == {second, third}
+    assert graph.upstream(third) == {first, second, fourth}
+    assert graph.upstream(second, fourth) == {first}
+
+    graph.dirty.clear()
+    graph.set_lazy()
+    first.a.set(1.0)
+    assert graph.dirty == {first, second, third}
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import pytest
+import ends
+from ends.evaluators.parallel import ProcessPool
+from ends.evaluators.shared import share
+
+
+def shared_blob(size: int) -> bytes:
+    return b'x' * size
+
+
+def shared_pair(a: bytes, b: bytes) -> int:
+    return len(a) + len(b)
+
+
+def shared_single(a: bytes) -> int:
+    return len(a)
+
+
+FUNCS = (shared_blob, shared_pair, shared_single)
+
+
+def build():
+    graph = ends.Graph('shared_readers')
+    blob = graph.create('shared_blob')
+    pair = graph.create('shared_pair')
+    single = graph.create('shared_single')
+    blob.size.set(1024)
+    graph.connect(blob.result, pair.a)
+    graph.connect(blob.result, pair.b)
+    graph.connect(blob.result, single.a)
+    return graph, blob, pair, single
+
+
+def test_shared_result_read_twice_by_one_node():
+    for func in FUNCS:
+        ends.register(func)
+    try:
+        graph, blob, pair, single = build()
+        pool = ProcessPool(processes=1, threshold=16)
+        blob.result._value = share(b'x' * 1024, 16)
+        pool.read(blob)
+        assert pool.shared[blob.result][1] == 2
+
+        # pair reads blob through two parameters but is one reader
+        pair.result._value = 2048
+        pool.read(pair)
+        assert pool.shared[blob.result][1] == 1
+
+        single.result._value = 1024
+        pool.read(single)
+        assert blob.result not in pool.shared
+        assert blob.result._value == b'x' * 1024
+    finally:
+        for func in FUNCS:
+            ends.unregister(func)
+
+
+def test_parallel_evaluation_of_shared_results():
+    for func in FUNCS:
+        ends.register(func)
+    try:
+        graph, blob, pair, single = build()
+        graph.set_evaluator(ends.ParallelEvaluator, processes=1, threshold=16)
+        try:
+            graph.evaluate()
+        finally:
+            graph.set_evaluator(ends.SerialEvaluator)
+        assert pair.result.get() == 2048
+        assert single.result.get() == 1024
+        assert blob.result.get() == b'x' * 1024
+    finally:
+        for func in FUNCS:
+            ends.unregister(func)
+
+
+def test_shared_memory_is_disabled_outside_posix(monkeypatch):
+    from ends.evaluators import parallel
+    monkeypatch.setattr(parallel, 'SUPPORTED', False)
+    monkeypatch.setattr(
+        parallel.resource_tracker, 'ensure_running',
+        lambda: pytest.fail('Started a resource tracker'),
+    )
+    pool = ProcessPool(processes=1, threshold=16)
+    assert pool.threshold is None
+    pool.start()
+    pool.stop()
+
+
+def hybrid_inline(a: int) -> int:
+    return a + 1
+
+
+def hybrid_offload(a: int) -> int:
+    return a * 2
+
+
+def test_hybrid_offloads_from_the_first_expensive_node():
+    ends.register(hybrid_inline)
+    ends.register(hybrid_offload, offload=True)
+    try:
+        graph = ends.Graph('hybrid')
+        first = graph.create('hybrid_inline')
+        second = graph.create('hybrid_inline')
+        third = graph.create('hybrid_offload')
+        first.a.set(1)
+        graph.connect(first.result, second.a)
+        graph.connect(second.result, third.a)
+        graph.set_evaluator(ends.HybridEvaluator, processes=1)
+        try:
+            submit = graph.evaluator.submit
+            submitted = []
+
+            def record(node):
+                submitted.append(node)
+                submit(node)
+
+            graph.evaluator.submit = record
+            graph.evaluate()
+        finally:
+            graph.set_evaluator(ends.SerialEvaluator)
+        assert submitted == [third]
+        assert third.result.get() == 6
+    finally:
+        ends.unregister(hybrid_inline)
+        ends.unregister(hybrid_offload)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import random
+import typing
+import pytest
+import ends
+from ends.validate import validator
+
+
+def test_sampling_keeps_the_global_random_state():
+    check = validator(typing.List[int], sample=True)
+    random.seed(0)
+    expected = [random.random() for i in range(3)]
+    random.seed(0)
+    values = []
+    for i in range(3):
+        assert check([1, 2, 3])
+        values.append(random.random())
+    assert values == expected
+
+
+def test_annotated_checks_the_underlying_type():
+    check = validator(typing.Annotated[int, 'metadata'])
+    assert check(3)
+    assert not check('3')
+    check = validator(typing.List[typing.Annotated[int, 'metadata']])
+    assert check([1, 2])
+    assert not check([1, '2'])
+
+
+def test_nested_generics():
+    check = validator(typing.Dict[str, typing.List[typing.Set[int]]])
+    assert check({'a': [{1, 2}, set()], 'b': []})
+    assert not check({'a': [{1, 'x'}]})
+    assert not check({1: [{1}]})
+    assert not check({'a': [[1]]})
+
+
+def test_optional_and_union():
+    check = validator(typing.Optional[typing.List[int]])
+    assert check(None) and check([1])
+    assert not check(['1'])
+    check = validator(typing.Union[int, str])
+    assert check(1) and check('1')
+    assert not check(1.0)
+    assert validator(typing.Union[int, typing.Any]) is None
+
+
+def test_tuples():
+    check = validator(typing.Tuple[int, str])
+    assert check((1, 'a'))
+    assert not check((1, 2))
+    assert not check((1, 'a', 'b'))
+    check = validator(typing.Tuple[int, ...])
+    assert check(()) and check((1, 2, 3))
+    assert not check((1, 'a'))
+    check = validator(typing.Tuple[()])
+    assert check(())
+    assert not check((1,))
+
+
+def test_sample_checks_one_item():
+    check = validator(typing.List[int], sample=True)
+    assert check([1, 2, 3])
+    assert not check(['a', 'b'])
+    check = validator(typing.Dict[str, int], sample=True)
+    assert check({'a': 1})
+    assert not check({'a': 'b'})
+
+
+def validated(a: typing.List[int], b: typing.Annotated[int, 'units']) -> int:
+    return len(a) + b
+
+
+@pytest.fixture
+def node():
+    ends.register(validated)
+    try:
+        yield ends.Graph('validated').create('validated')
+    finally:
+        ends.unregister(validated)
+
+
+def test_graph_modes(node):
+    node.b.set(3)
+    with pytest.raises(TypeError):
+        node.b.set('3')
+    with pytest.raises(TypeError):
+        node.a.set([1, 'a'])
+
+    node.graph.set_validation('sample')
+    node.a.set([1, 2])
+    with pytest.raises(TypeError):
+        node.a.set(['a'])
+    with pytest.raises(TypeError):
+        node.a.set((1, 2))
+
+    node.graph.set_validation('off')
+    node.a.set(['a'])
+    node.b.set('3')
+    with pytest.raises(ValueError):
+        node.graph.set_validation('loose')
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+'''
+Type Validation
+===============
+
+Compiles type annotations into validator functions. Validators are built
+once per annotation and cached on each FuncType, so Parameter.set and
+Result.set only call a prebuilt function.
+
+Plain classes are checked with isinstance. typing generics like
+List[float], Dict[str, int], Tuple[int, ...], Optional[str] and Union are
+checked along with their items, Annotated by its underlying type.
+Annotations that can not be checked, like forward references as strings,
+accept any value.
+
+Graphs choose how thoroughly values are validated, see Graph.set_validation.
+
+    strict  Check every item of containers
+    sample  Check one randomly chosen item of containers
+    off     Skip validation
+'''
+__all__ = ['MODES', 'validator', 'validators']
+
+from collections import abc
+import random
+import types
+import typing
+from .func import Lazy, empty
+
+
+MODES = ('strict', 'sample', 'off')
+
+_validators = {}
+
+# Own generator, sampling must not advance the user's random module state
+_random = random.Random()
+
+
+def validator(annotation, sample=False):
+    '''Function returning True when a value matches annotation. Returns None
+    when any value matches. With sample=True only one item of containers
+    is checked.
+    '''
+
+    key = annotation, sample
+    try:
+        return _validators[key]
+    except KeyError:
+        pass
+    except TypeError:
+        return build(annotation, sample)  # Unhashable annotation
+    result = _validators[key] = build(annotation, sample)
+    return result
+
+
+def validators(sig):
+    '''Dict of strict and sample validators keyed by the names of a
+    signature's parameters and "return" for its return annotation.
+    '''
+
+    annotations = {
+        name: param.annotation for name, param in sig.parameters.items()
+    }
+    annotations['return'] = sig.return_annotation
+    return {
+        name: (validator(annotation), validator(annotation, sample=True))
+        for name, annotation in annotations.items()
+    }
+
+
+def build(annotation, sample):
+    if annotation in (empty, typing.Any, object):
+        return None
+    if annotation is None:
+        annotation = type(None)
+
+    if isinstance(annotation, (tuple, list)):
+        return union(annotation, sample)
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Annotated:
+        return build(args[0], sample)  # Metadata is not checked
+    if origin is typing.Union or origin is getattr(types, 'UnionType', None):
+        return union(args, sample)
+    if origin is typing.Literal:
+        return lambda value: any(value == arg for arg in args)
+    if origin is None:
+        supertype = getattr(annotation, '__supertype__', None)
+        if supertype is not None:
+            return build(supertype, sample)  # NewType
+        if isinstance(annotation, type):
+            return instance(annotation)
+        return None  # TypeVar, forward reference...
+
+    check = instance(origin)
+    if origin is tuple and (
+        args == ((),) or getattr(annotation, '__args__', None) == ()
+    ):
+        return lambda value: check(value) and value == ()  # Tuple[()]
+    if not args:
+        return check
+
+    if origin is tuple:
+        if len(args) == 2 and args[1] is Ellipsis:
+            return items(check, build(args[0], sample), sample)
+        checks = [build(arg, sample) for arg in args]
+
+        def check_tuple(value):
+            if not check(value):
+                return False
+            if isinstance(value, Lazy):
+                return True
+            if len(value) != len(checks):
+                return False
+            return all(c is None or c(v) for c, v in zip(checks, value))
+        return check_tuple
+
+    if origin is type:
+        bound = args[0]
+        if not isinstance(bound, type):
+            return check
+        return lambda value: check(value) and issubclass(value, bound)
+
+    if issubclass(origin, abc.Mapping) and len(args) == 2:
+        return mapping(check, build(args[0], sample), build(args[1], sample),
+                       sample)
+    if issubclass(origin, abc.Collection) and len(args) == 1:
+        return items(check, build(args[0], sample), sample)
+    return check
+
+
+def instance(cls):
+    def check_instance(value):
+        if isinstance(value, Lazy):
+            return value.type is None or issubclass(value.type, cls)
+        return isinstance(value, cls)
+    return check_instance
+
+
+def union(annotations, sample):
+    checks = [build(annotation, sample) for annotation in annotations]
+    if None in checks:
+        return None
+    return lambda value: any(check(value) for check in checks)
+
+
+def items(check, item, sample):
+    '''Check a collection and its items'''
+
+    if item is None:
+        return check
+
+    def check_items(value):
+        if not check(value):
+            return False
+        if isinstance(value, Lazy) or not value:
+            return True
+        if not sample:
+            return all(item(v) for v in value)
+        if isinstance(value, abc.Sequence):
+            return item(value[_random.randrange(len(value))])
+        return item(next(iter(value)))
+    return check_items
+
+
+def mapping(check, key, value_check, sample):
+    '''Check a mapping and its keys and values'''
+
+    if key is None and value_check is None:
+        return check
+    key = key or (lambda k: True)
+    value_check = value_check or (lambda v: True)
+
+    def check_mapping(value):
+        if not check(value):
+            return False
+        if isinstance(value, Lazy) or not value:
+            return True
+        if not sample:
+            return all(key(k) and value_check(v) for k, v in value.items())
+        k, v = next(iter(value.items()))
+        return key(k) and value_check(v)
+    return check_mapping
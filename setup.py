@@ -26,8 +26,10 @@ setup(
         'Operating System :: Microsoft :: Windows',
         'Operating System :: POSIX',
         'Programming Language :: Python',
+        'Programming Language :: Python :: 3',
     ],
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
     include_package_data=True,
+    python_requires='>=3.9',
     install_requires=['cloudpickle'],
 )